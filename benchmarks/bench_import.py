@@ -0,0 +1,59 @@
+"""Measures the time of `import dictoo` in fresh interpreters and which heavy modules it pulls in.
+
+	PYTHONPATH=. python benchmarks/bench_import.py --runs 20 --max-ms 50
+
+The import time is read from `python -X importtime`, with the bytecode cache
+enabled as in an installed package. The exit code is 1 if the median exceeds
+--max-ms or a module that should be imported on first use is already loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# imported on first use of yaml files, executors, caches and pickling
+DEFERRED = ["yaml", "concurrent.futures", "multiprocessing", "hashlib", "pickle"]
+
+
+def import_time_us(env: dict) -> int:
+	res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import dictoo"], env=env, capture_output=True, text=True, check=True)
+	for line in res.stderr.splitlines():
+		# import time: self [us] | cumulative | imported package
+		parts = [p.strip() for p in line.split("|")]
+		if len(parts) == 3 and parts[2] == "dictoo":
+			return int(parts[1])
+	raise RuntimeError("import dictoo is missing in the -X importtime output")
+
+def loaded_modules(env: dict) -> list:
+	code = "import sys, dictoo; print(' '.join(sys.modules))"
+	res = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+	return res.stdout.split()
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--runs", type=int, default=20)
+	parser.add_argument("--max-ms", type=float, default=None, help="fail if the median import time is larger")
+	args = parser.parse_args()
+
+	env = dict(os.environ)
+	env.pop("PYTHONDONTWRITEBYTECODE", None)
+	# the first run writes the bytecode cache
+	import_time_us(env)
+	times = [import_time_us(env) / 1000 for _ in range(args.runs)]
+	modules = loaded_modules(env)
+	deferred_loaded = [m for m in DEFERRED if m in modules]
+
+	median = statistics.median(times)
+	print(json.dumps({
+		"median_ms": round(median, 2),
+		"min_ms": round(min(times), 2),
+		"max_ms": round(max(times), 2),
+		"deferred_but_loaded": deferred_loaded,
+	}))
+	if deferred_loaded or (args.max_ms is not None and median > args.max_ms):
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
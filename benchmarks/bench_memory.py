@@ -0,0 +1,39 @@
+"""Measures the memory used per DictooDict/DictooList node.
+
+	PYTHONPATH=. python benchmarks/bench_memory.py --records 100000
+"""
+import argparse
+import json
+import tracemalloc
+
+import dictoo as dt
+
+
+def make_records(n: int) -> list:
+	# every record has three containers: the record, 'x' and 'x.b'
+	return [{'id': i, 'x': {'a': i, 'b': [i, i]}} for i in range(n)]
+
+def traced(fn):
+	tracemalloc.start()
+	res = fn()
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return res, size
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--records", type=int, default=100000)
+	args = parser.parse_args()
+
+	text = json.dumps(make_records(args.records))
+	plain, plain_bytes = traced(lambda: json.loads(text))
+	nodes = 1 + 3 * args.records
+	d, dictoo_bytes = traced(lambda: dt.Dictoo(json.loads(text)))
+	print(json.dumps({
+		"nodes": nodes,
+		"plain_bytes_per_node": round(plain_bytes / nodes, 1),
+		"dictoo_bytes_per_node": round(dictoo_bytes / nodes, 1),
+	}))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,226 @@
+"""Times the core Dictoo operations on synthetic trees and compares them against a baseline.
+
+	PYTHONPATH=. python benchmarks/bench_suite.py --output baseline.json
+	PYTHONPATH=. python benchmarks/bench_suite.py --baseline baseline.json --threshold 1.2
+	PYTHONPATH=. python benchmarks/bench_suite.py --numpy --only apply,reduce
+
+The results are printed as json, the exit code is 1 if a benchmark is slower
+than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import dictoo as dt
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+	"""Registers fn(cfg) -> run, where run() is the timed part."""
+	BENCHMARKS[fn.__name__] = fn
+	return fn
+
+def make_leaf(cfg, i: int):
+	if cfg.numpy:
+		import numpy as np
+		return np.full(cfg.array_size, i, dtype=np.float64)
+	return i
+
+def make_tree(cfg, width: int, depth: int, i: int = 0) -> dict:
+	if depth == 1:
+		return {"k{}".format(j): make_leaf(cfg, i + j) for j in range(width)}
+	return {"k{}".format(j): make_tree(cfg, width, depth - 1, i + j) for j in range(width)}
+
+def make_records(cfg) -> list:
+	return [make_tree(cfg, cfg.record_width, cfg.record_depth, i) for i in range(cfg.records)]
+
+def leaf_keys(width: int, depth: int) -> list:
+	keys = [()]
+	for _ in range(depth):
+		keys = [k + ("k{}".format(j),) for k in keys for j in range(width)]
+	return keys
+
+### CONSTRUCTION
+@benchmark
+def construct(cfg):
+	data = make_tree(cfg, cfg.width, cfg.depth)
+	return lambda: dt.Dictoo(data)
+
+@benchmark
+def construct_lazy(cfg):
+	data = make_tree(cfg, cfg.width, cfg.depth)
+	return lambda: dt.Dictoo(data, __lazy=True)
+
+@benchmark
+def construct_records(cfg):
+	data = make_records(cfg)
+	return lambda: dt.Dictoo(data)
+
+### ACCESS
+@benchmark
+def get_dotted(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	keys = [".".join(k) for k in leaf_keys(cfg.width, cfg.depth)]
+	def run():
+		for k in keys:
+			d[k]
+	return run
+
+@benchmark
+def get_tuple(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	keys = leaf_keys(cfg.width, cfg.depth)
+	def run():
+		for k in keys:
+			d[k]
+	return run
+
+@benchmark
+def set_dotted(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	keys = [".".join(k) for k in leaf_keys(cfg.width, cfg.depth)]
+	v = make_leaf(cfg, 0)
+	def run():
+		for k in keys:
+			d[k] = v
+	return run
+
+@benchmark
+def batch_columns(cfg):
+	records = dt.Dictoo(make_records(cfg))
+	keys = [".".join(k) for k in leaf_keys(cfg.record_width, cfg.record_depth)]
+	def run():
+		columns = records.batch()
+		for k in keys:
+			columns[k]
+	return run
+
+### TRAVERSAL
+@benchmark
+def flattened(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	return d.flattened
+
+@benchmark
+def leafs(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	return d.leafs
+
+@benchmark
+def search(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	# the last leaf is found last by a depth-first search
+	key = "k{}".format(cfg.width - 1)
+	return lambda: d.search(key)
+
+@benchmark
+def apply(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	return lambda: dt.apply(lambda x: x * 2, d)
+
+@benchmark
+def apply_treedef(cfg):
+	d = dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth))
+	_, treedef = dt.flatten(d)
+	return lambda: dt.apply(lambda x: x * 2, d, _dictoo_treedef=treedef)
+
+@benchmark
+def reduce(cfg):
+	values = [dt.Dictoo(make_tree(cfg, cfg.width, cfg.depth, i)) for i in range(4)]
+	return lambda: dt.reduce(sum, values)
+
+### IO
+@benchmark
+def from_file(cfg):
+	if cfg.numpy:
+		return None
+	fd, path = tempfile.mkstemp(suffix=".json")
+	with os.fdopen(fd, "w") as f:
+		json.dump(make_records(cfg), f)
+	cfg.cleanup.append(path)
+	return lambda: dt.Dictoo.from_file(path)
+
+@benchmark
+def from_file_select(cfg):
+	if cfg.numpy:
+		return None
+	# the selected key comes after the records, which are skipped without being parsed
+	fd, path = tempfile.mkstemp(suffix=".json")
+	with os.fdopen(fd, "w") as f:
+		json.dump({"records": make_records(cfg), "meta": {"optimizer": {"lr": 0.1}}}, f)
+	cfg.cleanup.append(path)
+	return lambda: dt.Dictoo.from_file(path, select=["meta.optimizer"])
+
+@benchmark
+def pickle_roundtrip(cfg):
+	d = dt.Dictoo(make_records(cfg))
+	return lambda: pickle.loads(pickle.dumps(d, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def timeit(run, repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		run()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+	res = {}
+	for name, seconds in results.items():
+		if name in baseline:
+			ratio = seconds / baseline[name]
+			res[name] = {"ratio": round(ratio, 3), "regression": ratio > threshold}
+	return res
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--width", type=int, default=10, help="keys per dict of the synthetic tree")
+	parser.add_argument("--depth", type=int, default=4, help="levels of the synthetic tree")
+	parser.add_argument("--records", type=int, default=10000, help="records of the list benchmarks")
+	parser.add_argument("--record-width", type=int, default=4)
+	parser.add_argument("--record-depth", type=int, default=2)
+	parser.add_argument("--numpy", action="store_true", help="use numpy arrays as leaves")
+	parser.add_argument("--array-size", type=int, default=16)
+	parser.add_argument("--repeat", type=int, default=5, help="the best of this many runs is reported")
+	parser.add_argument("--only", type=str, default=None, help="comma separated benchmark names")
+	parser.add_argument("--output", type=str, default=None, help="also write the results to this file")
+	parser.add_argument("--baseline", type=str, default=None, help="results of an earlier run to compare against")
+	parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio that counts as a regression")
+	cfg = parser.parse_args()
+	cfg.cleanup = []
+
+	names = cfg.only.split(",") if cfg.only else list(BENCHMARKS)
+	results = {}
+	try:
+		for name in names:
+			run = BENCHMARKS[name](cfg)
+			if run is not None:
+				results[name] = timeit(run, cfg.repeat)
+	finally:
+		for path in cfg.cleanup:
+			os.remove(path)
+
+	config = {k: v for k, v in vars(cfg).items() if k not in ("cleanup", "only", "output", "baseline", "threshold", "repeat")}
+	out = {"config": config, "results": results}
+	if cfg.baseline:
+		with open(cfg.baseline) as f:
+			baseline = json.load(f)
+		if baseline.get("config") != config:
+			print("warning: the baseline was measured with a different config", file=sys.stderr)
+		out["comparison"] = compare(results, baseline["results"], cfg.threshold)
+
+	print(json.dumps(out, indent=2))
+	if cfg.output:
+		with open(cfg.output, "w") as f:
+			json.dump(out, f, indent=2)
+	if any(c["regression"] for c in out.get("comparison", {}).values()):
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -1,2 +1,12 @@
-from .dictoo import Dictoo
+from .dictoo import Dictoo, register_format
 from .op import *
+from .paths import path, DictooPath
+from .tree import TreeDef, flatten, unflatten
+from .frozen import FrozenDictoo
+from .diff import diff, patch
+from .shared import to_shared, from_shared
+from .serialize import register_encoder
+from .schema import Schema
+from .stats import stats, reset_stats, enable_stats, disable_stats
+from .reducers import Reducer, Sum, Mean, Max, Min, stream_reduce
+from .query import query, Query
@@ -1,61 +1,491 @@
 from abc import abstractmethod
+import collections.abc
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Mapping, Sequence, SupportsIndex, Tuple, Type, Union
-import json, yaml
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence, SupportsIndex, Tuple, Type, Union
+import json
 import warnings
 import os
+import threading
 
-CONFIG = {
+_DEFAULT_CONFIG = {
 	"delim": ".",
 	"use_delimited_keys": True,
+	# apply and foreach call the op serially for trees with fewer leaves
+	"parallel_min_leaves": 64,
+	# workers of the pools created for an executor="thread"/"process" argument and the number
+	# of workers that work is split for, None for the number of cpus
+	"parallel_workers": None,
+	# number of characters read at once by the streaming readers
+	"stream_chunk_size": 1 << 16,
+	# directory of the parse cache used by from_file(..., cache=True)
+	"cache_dir": os.path.join(os.path.expanduser("~"), ".cache", "dictoo"),
 }
 
-dictoo_config_file = os.environ.get("DICTOO_CONFIG_FILE", ".dictoo-config.json")
-if os.path.exists(dictoo_config_file):
-	with open(dictoo_config_file, "r") as f:
-		config = json.load(f)
-		CONFIG.update(config)
+
+_CONFIG_LOCK = threading.Lock()
+
+class _Config(dict):
+	"""The settings, the config file is only read when the first setting is looked up.
+
+	Until then the dict only holds the settings that were assigned explicitly, a
+	lookup misses and `__missing__` fills in the config file and the defaults
+	without overriding them. Afterwards lookups are plain dict lookups.
+	"""
+	__slots__ = ('_loaded',)
+
+	def __init__(self):
+		super().__init__()
+		self._loaded = False
+
+	def _load(self):
+		if self._loaded:
+			return
+		# the first lookups can come from several threads, e.g. the workers of `from_files`
+		with _CONFIG_LOCK:
+			if self._loaded:
+				return
+			config_file = os.environ.get("DICTOO_CONFIG_FILE", ".dictoo-config.json")
+			if os.path.exists(config_file):
+				with open(config_file, "r") as f:
+					for k, v in json.load(f).items():
+						self.setdefault(k, v)
+			for k, v in _DEFAULT_CONFIG.items():
+				self.setdefault(k, v)
+			# only set once all settings are filled in, lookups before this wait for the lock
+			self._loaded = True
+
+	def __missing__(self, k):
+		if self._loaded:
+			raise KeyError(k)
+		self._load()
+		return self[k]
+
+	def _loading(name):
+		def method(self, *args, **kwargs):
+			self._load()
+			return getattr(dict, name)(self, *args, **kwargs)
+		method.__name__ = name
+		return method
+
+	get = _loading('get')
+	keys = _loading('keys')
+	values = _loading('values')
+	items = _loading('items')
+	copy = _loading('copy')
+	__contains__ = _loading('__contains__')
+	__iter__ = _loading('__iter__')
+	__len__ = _loading('__len__')
+	__eq__ = _loading('__eq__')
+	__repr__ = _loading('__repr__')
+	del _loading
+
+CONFIG = _Config()
+
+
+def __getattr__(name):
+	# yaml is only imported when YAML_LOADER is used
+	if name == "YAML_LOADER":
+		return _yaml_loader()
+	raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+@lru_cache(maxsize=None)
+def _yaml_loader():
+	import yaml
+	# the libyaml bindings are much faster than the pure python loader
+	return getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=4096)
+def _split_key(k: str, delim: str) -> Tuple[str, ...]:
+	return tuple(k.split(delim))
+
+def _child(node, k):
+	"""Returns the child of a dict or list without autovivification or copying, _MISSING if there is none."""
+	if isinstance(node, dict):
+		v = dict.get(node, k, _MISSING)
+	elif isinstance(node, list) and isinstance(k, int):
+		try:
+			v = list.__getitem__(node, k)
+		except IndexError:
+			return _MISSING
+	else:
+		return _MISSING
+	if isinstance(v, (dict, list)) and not isinstance(v, Dictoo) and isinstance(node, Dictoo) and node._lazy:
+		# let the lazy parent wrap the child so that it is only wrapped once
+		v = node[k]
+	return v
+
+def _descend(node, segments):
+	for k in segments:
+		node = _child(node, k)
+		if node is _MISSING:
+			break
+	return node
+
+def _read_json(path: Path, select: Sequence[str] | None) -> Union[dict, list]:
+	with open(path, "r") as f:
+		if select is not None:
+			from .stream import load_json_selected
+			return load_json_selected(f, select)
+		return json.load(f)
+
+def _read_yaml(path: Path, select: Sequence[str] | None) -> Union[dict, list]:
+	import yaml
+	with open(path, "r") as f:
+		if select is not None:
+			from .stream import load_yaml_selected
+			return load_yaml_selected(f, select)
+		return yaml.load(f, Loader=_yaml_loader())
+
+def _write_json(node, fp, **kwargs):
+	from .serialize import to_json
+	to_json(node, fp, **kwargs)
+
+def _write_yaml(node, fp, **kwargs):
+	from .serialize import to_yaml
+	to_yaml(node, fp, **kwargs)
+
+# file suffix -> (read(path, select) -> plain data, write(node, fp, **kwargs) or None)
+_FORMATS: Dict[str, Tuple[Callable, Union[Callable, None]]] = {
+	".json": (_read_json, _write_json),
+	".yaml": (_read_yaml, _write_yaml),
+	".yml": (_read_yaml, _write_yaml),
+}
+
+def register_format(suffix: str, read: Callable[[Path, Sequence[str] | None], Union[dict, list]], write: Callable | None = None) -> None:
+	"""Registers a file format for `from_file`, `from_files` and `dump`.
+
+	Args:
+		suffix: the file name suffix, e.g. '.toml'
+		read: read(path, select) returns the plain data of a file. select is None unless
+			the caller asked for a selection, readers that cannot select load everything.
+		write: write(node, fp, **kwargs) writes a Dictoo to a text file
+	Import the parser inside read and write so that it is only imported on first use.
+	"""
+	_FORMATS[suffix] = (read, write)
+
+def _format(path: Path) -> Tuple[Callable, Union[Callable, None]]:
+	for suffix, fmt in _FORMATS.items():
+		if path.name.endswith(suffix):
+			return fmt
+	raise ValueError("Unsupported file format {}, see register_format".format(path.name))
+
+def _cache_file(path: Path, select: Sequence[str] | None) -> Path:
+	import hashlib
+	st = path.stat()
+	key = "{}\0{}\0{}\0{}".format(path.resolve(), st.st_mtime_ns, st.st_size, None if select is None else list(select))
+	return Path(CONFIG["cache_dir"]).expanduser() / (hashlib.sha1(key.encode()).hexdigest() + ".pickle")
+
+def _load(path: str | Path, read: Callable, select: Sequence[str] | None, cache: bool) -> Union[dict, list]:
+	import pickle
+	path = Path(path)
+	if path.stat().st_size == 0:
+		return {}
+	if not cache:
+		return read(path, select)
+
+	cache_file = _cache_file(path, select)
+	try:
+		with open(cache_file, "rb") as f:
+			return pickle.load(f)
+	except (OSError, EOFError, pickle.UnpicklingError):
+		pass
+	data = read(path, select)
+	cache_file.parent.mkdir(parents=True, exist_ok=True)
+	# write to a unique temporary file first so that concurrent loads, also from threads,
+	# never read a partial cache file or write the same temporary file
+	import tempfile
+	fd, tmp_file = tempfile.mkstemp(suffix=".tmp", prefix=cache_file.name + ".", dir=cache_file.parent)
+	try:
+		with os.fdopen(fd, "wb") as f:
+			pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_file, cache_file)
+	except BaseException:
+		os.remove(tmp_file)
+		raise
+	return data
+
+
+class _DictooTree:
+	"""State that is shared by all nodes of a Dictoo instead of being stored per node."""
+	__slots__ = ('type', 'index')
+
+	def __init__(self, type: Union[Type, None] = None):
+		self.type = type
+		self.index = None
+
+	def __reduce__(self):
+		# the index refers to nodes by id and is not pickled, untyped trees unpickle to _DEFAULT_TREE
+		return (_tree_for, (self.type,))
+
+# shared by all untyped Dictoos, it is never modified
+_DEFAULT_TREE = _DictooTree()
+
+def _tree_for(type: Union[Type, None]) -> _DictooTree:
+	return _DEFAULT_TREE if type is None else _DictooTree(type)
+
+def _new_node(cls, tree: _DictooTree, lazy: bool = False, parent: Union[Tuple, None] = None):
+	# dict.__new__, list.__new__ or object.__new__
+	d = super(Dictoo, cls).__new__(cls)
+	object.__setattr__(d, '_tree', tree)
+	object.__setattr__(d, '_lazy', lazy)
+	object.__setattr__(d, '_parent', parent)
+	return d
+
+def _retree(node, old: _DictooTree, new: _DictooTree):
+	"""Moves a node and all nodes below it that share its tree state to a new tree state."""
+	if not isinstance(node, Dictoo) or node._tree is not old:
+		return
+	object.__setattr__(node, '_tree', new)
+	for v in (dict.values(node) if isinstance(node, dict) else list.__iter__(node)):
+		_retree(v, old, new)
+
+
+class _PickledBytes:
+	"""Passes a bytes leaf to pickle protocol 5 as an out-of-band buffer."""
+	__slots__ = ('data',)
+
+	def __init__(self, data: bytes):
+		self.data = data
+
+	def __reduce_ex__(self, protocol):
+		import pickle
+		return (bytes, (pickle.PickleBuffer(self.data),))
+
+def _encode(node, leaves: List[Any], specs: Dict, protocol: int) -> Tuple:
+	"""Returns the structure of a node as nested tuples and appends its leaves.
+
+	Equal structures are replaced by a single tuple so that pickle stores e.g. the
+	structure shared by all records of a list once and refers to it afterwards.
+	"""
+	if type(node) is DictooDict:
+		keys = tuple(dict.keys(node))
+		values = dict.values(node)
+	else:
+		keys = len(node)
+		values = list.__iter__(node)
+	children = []
+	for v in values:
+		if type(v) is DictooDict or type(v) is DictooList:
+			children.append(_encode(v, leaves, specs, protocol))
+		else:
+			# numpy arrays pass themselves out-of-band at protocol 5
+			leaves.append(_PickledBytes(v) if protocol >= 5 and type(v) is bytes else v)
+			children.append(None)
+	children = tuple(children)
+	# the children are already shared, comparing them by id avoids rehashing the subtrees
+	key = (type(node), node._tree, node._lazy, keys, tuple(map(id, children)))
+	spec = specs.get(key)
+	if spec is None:
+		spec = specs[key] = (type(node), node._tree, node._lazy, keys, children)
+	return spec
+
+def _decode(spec: Tuple, leaves: Iterator[Any]):
+	cls, tree, lazy, keys, children = spec
+	node = _new_node(cls, tree, lazy)
+	values = [next(leaves) if c is None else _decode(c, leaves) for c in children]
+	if cls is DictooDict:
+		dict.update(node, zip(keys, values))
+	else:
+		list.extend(node, values)
+	return node
+
+def _trusted(v, tree: '_DictooTree'):
+	# typing.List and typing.Mapping make isinstance slow, the builtin and abc classes are used instead
+	if isinstance(v, Dictoo):
+		return v
+	elif isinstance(v, list):
+		node = _new_node(DictooList, tree)
+		list.extend(node, [_trusted(x, tree) for x in v])
+		return node
+	elif isinstance(v, (dict, collections.abc.Mapping)):
+		node = _new_node(DictooDict, tree)
+		_trusted_items(node, v, tree)
+		return node
+	return v
+
+def _trusted_items(node: 'DictooDict', v: Mapping, tree: '_DictooTree'):
+	delim = CONFIG["delim"]
+	for k, x in v.items():
+		if isinstance(k, str) and delim in k:
+			# delimited keys are nested like in the checked constructor
+			node[k] = x
+		else:
+			dict.__setitem__(node, k, _trusted(x, tree))
+
+def _copy_node(node, trees: Dict[int, '_DictooTree']):
+	tree = node._tree
+	if tree is not _DEFAULT_TREE:
+		# the copy shares one tree state per tree state of the original, without the index
+		if id(tree) not in trees:
+			trees[id(tree)] = _DictooTree(tree.type)
+		tree = trees[id(tree)]
+	res = _new_node(type(node), tree, node._lazy)
+	# the unwrapped children of lazy nodes are shared, wrapping never modifies them
+	if isinstance(node, dict):
+		dict.update(res, {k: _copy_node(v, trees) if isinstance(v, Dictoo) else v for k, v in dict.items(node)})
+	else:
+		list.extend(res, [_copy_node(v, trees) if isinstance(v, Dictoo) else v for v in list.__iter__(node)])
+	return res
+
+def _unpickle(spec: Tuple, leaves: List[Any]):
+	# the values were checked when they were inserted, _check_value is not run again
+	return _decode(spec, iter(leaves))
 
 
 class Dictoo:
+	# the metadata of each node lives in the __slots__ of the subclasses:
+	# _tree: the _DictooTree shared with the rest of the tree
+	# _lazy: whether nested dicts and lists are still stored unconverted
+	# _parent: (parent, key) of a temporary created by __missing__ until it is attached
+	__slots__ = ()
+
 	def __new__(cls, data=None, **kwargs):
 
 		parent = kwargs.pop('__parent', None)
 		key = kwargs.pop('__key', None)
+		tree = kwargs.pop('__tree', None)
 		type = kwargs.pop('__type', None)
+		lazy = kwargs.pop('__lazy', False)
+		if tree is None:
+			tree = _tree_for(type)
+		parent = (parent, key) if parent is not None and key is not None else None
 
 		if data is None:
-			d = object.__new__(DictooEmpty, **kwargs)
+			return _new_node(DictooEmpty, tree, lazy, parent)
 		elif isinstance(data, Mapping):
-			d = DictooDict.__new__(DictooDict, data, **kwargs)
+			return _new_node(DictooDict, tree, lazy, parent)
 		elif isinstance(data, List):
-			d = DictooList.__new__(DictooList, data, **kwargs)
+			return _new_node(DictooList, tree, lazy, parent)
 		else:
 			raise ValueError("unsupported constructor argument {}".format(data))
-		
-		object.__setattr__(d, '__parent', parent)
-		object.__setattr__(d, '__key', key)
-		object.__setattr__(d, '__type', type)
-		
-		return d
+
+	def __getstate__(self):
+		return (self._tree, self._lazy)
+
+	def __setstate__(self, state):
+		object.__setattr__(self, '_tree', state[0])
+		object.__setattr__(self, '_lazy', state[1])
+
+	def __reduce_ex__(self, protocol):
+		if not isinstance(self, (DictooDict, DictooList)):
+			return super().__reduce_ex__(protocol)
+		leaves = []
+		spec = _encode(self, leaves, {}, protocol)
+		return (_unpickle, (spec, leaves))
 
 	### UTILS
 	def set_type(self, type: Type):
-		object.__setattr__(self, '__type', type)
+		"""Sets the type of the values of this Dictoo and of all Dictoos below it.
+
+		All nodes of an indexed Dictoo share one tree state, so only the Dictoo
+		that the index was built on can set the type.
+		"""
+		if self._own_index() is not None:
+			self._tree.type = type
+			return
+		_retree(self, self._tree, _DictooTree(type))
 	
 	def get_type(self):
-		try:
-			dictoo_type = object.__getattribute__(self, '__type')
-		except AttributeError:
-			dictoo_type = None
-		return dictoo_type
+		return self._tree.type
+
+	def _wrap_lazy(self, v):
+		# wraps a plain dict/list that was stored unconverted by a lazy Dictoo
+		return Dictoo(v, __tree=self._tree, __lazy=True)
+
+	def _check_leaves(self, values):
+		# a lazy node checks its leaves when it is built, its nested dicts and lists when they are wrapped
+		if self._tree.type is None:
+			return
+		for v in values:
+			if not isinstance(v, (list, collections.abc.Mapping)):
+				self._check_value(v)
+
+	def _get_index(self) -> Union['_KeyIndex', None]:
+		return self._tree.index
+
+	def _own_index(self) -> Union['_KeyIndex', None]:
+		"""Returns the index built on this Dictoo, raises if it was built on an ancestor."""
+		index = self._tree.index
+		if index is not None and index.path_of(self) != ():
+			raise RuntimeError("The index was built on an ancestor of this Dictoo, use the Dictoo it was built on")
+		return index
+
+	def build_index(self) -> None:
+		"""Builds an inverted index from key names to paths that `search` and `search_all` use.
+
+		The index is kept up to date by __setitem__, __delitem__, append and insert.
+		Other mutations, e.g. dict.pop or list.extend, are not tracked and require a rebuild.
+		Dictoos that are already indexed are copied when they are inserted.
+		A Dictoo below the root of an index cannot build its own.
+		"""
+		self.drop_index()
+		index = _KeyIndex(self.get_type())
+		index.add(self, ())
+
+	def track_changes(self) -> int:
+		"""Starts recording which paths are modified and returns a token for `changes_since`.
+
+		Tracking builds the key index, see `build_index`, whose hooks in __setitem__,
+		__delitem__, append and insert record the modified paths. `drop_index` stops it.
+		"""
+		index = self._own_index()
+		if index is None:
+			self.build_index()
+			index = self._get_index()
+		if index.changes is None:
+			index.changes = _ChangeLog()
+		return index.changes.version
+
+	def changes_since(self, token: int) -> Tuple[List[Tuple], int]:
+		"""Returns the paths modified after the token and the token to pass next time.
+
+		Paths below another returned path are omitted, a modified path may no
+		longer exist if it was deleted. Mutations that shift list items return
+		the path of the whole list.
+		"""
+		index = self._own_index()
+		if index is None or index.changes is None:
+			raise RuntimeError("Changes are not tracked, call track_changes first")
+		return index.changes.since(token), index.changes.version
+
+	def delta_since(self, token: int) -> Tuple[List[Dict[str, Any]], int]:
+		"""Returns JSON-Patch operations that bring a copy of this Dictoo at token up to date, see `dictoo.patch`."""
+		from .diff import _escape
+		paths, new_token = self.changes_since(token)
+		changes = self._get_index().changes
+		ops = []
+		for path in paths:
+			pointer = "".join("/" + _escape(k) for k in path)
+			existed = changes.existed_at(path, token)
+			v = _descend(self, path)
+			if v is _MISSING:
+				# paths that were created and removed again after the token are not in the copy
+				if existed:
+					ops.append({'op': 'remove', 'path': pointer})
+			else:
+				ops.append({'op': 'replace' if existed else 'add', 'path': pointer, 'value': v.to_plain() if isinstance(v, Dictoo) else v})
+		return ops, new_token
+
+	def drop_index(self) -> None:
+		index = self._own_index()
+		if index is not None:
+			index.remove(self)
 
 	def _check_value(self, v):
-		dictoo_type = self.get_type()
+		tree = self._tree
+		dictoo_type = tree.type
 		if isinstance(v, Dictoo):
-			return v	
+			if tree.index is not None and v._tree.index is not None:
+				# an index keeps one path per node, an indexed node is copied instead of being stored twice
+				return v.copy()
+			return v
 		elif isinstance(v, Mapping) or isinstance(v, List):
-			return Dictoo(v, __type=dictoo_type)
+			# an indexed tree state is only shared once the new Dictoo is indexed
+			return Dictoo(v, __tree=tree if tree.index is None else _tree_for(dictoo_type))
 		else:
 			if dictoo_type is not None and not isinstance(v, dictoo_type):
 				raise TypeError("Trying to add an item of type {} to a Dictoo of type {}".format(type(v), dictoo_type))
@@ -63,7 +493,12 @@ class Dictoo:
 	
 	def _recurse_key(self, fn, k, *args, **kwargs) -> bool:
 		if isinstance(k, str):
-			ks = k.split(CONFIG["delim"], 1)
+			delim = CONFIG["delim"]
+			if delim not in k:
+				return False, None
+			# only the first segment is split off, which needs no cache
+			head, _, rest = k.partition(delim)
+			ks = (head, rest)
 		elif isinstance(k, tuple):
 			if len(k) == 0:
 				raise ValueError('Cannot recurse with empty key')
@@ -80,35 +515,151 @@ class Dictoo:
 
 	### CREATION
 	@staticmethod
-	def from_json(path: str | Path):
-		if Path(path).stat().st_size == 0:
-			return Dictoo({})
-		with open(path, "r") as f:
-			return Dictoo(json.load(f))
+	def from_json(path: str | Path, lazy: bool = False, select: Sequence[str] | None = None, cache: bool = False):
+		return Dictoo(_load(path, _read_json, select, cache), __lazy=lazy)
 
 	@staticmethod
-	def from_yaml(path: str | Path):
-		if Path(path).stat().st_size == 0:
-			return Dictoo({})
-		with open(path, "r") as f:
-			return Dictoo(yaml.load(f, Loader=yaml.FullLoader))
+	def from_yaml(path: str | Path, lazy: bool = False, select: Sequence[str] | None = None, cache: bool = False):
+		return Dictoo(_load(path, _read_yaml, select, cache), __lazy=lazy)
 
 	@staticmethod
-	def from_file(path: str | Path):
+	def iter_json(path: str | Path, items: str | None = None, batch_size: int | None = None, lazy: bool = False):
+		"""Streams the items of a JSON array without loading the whole file.
+
+		Args:
+			path: the JSON file
+			items: the array whose items are streamed, e.g. 'records[*]'. Defaults to the top-level array.
+			batch_size: if given, DictooLists of up to batch_size items are yielded instead
+			lazy: wrap the items lazily
+		"""
+		from .stream import iter_json
+		return iter_json(path, items=items, batch_size=batch_size, lazy=lazy)
+
+	@staticmethod
+	def iter_jsonl(path: str | Path, batch_size: int | None = None, lazy: bool = False):
+		"""Streams the records of a JSON Lines file, see `iter_json`."""
+		from .stream import iter_jsonl
+		return iter_jsonl(path, batch_size=batch_size, lazy=lazy)
+
+	@staticmethod
+	def from_file(path: str | Path, lazy: bool = False, select: Sequence[str] | None = None, cache: bool = False):
+		"""Loads a json or yaml file, or a file of a format added with `register_format`.
+
+		Args:
+			path: the file
+			lazy: wrap the loaded data lazily
+			select: only load the subtrees under these paths, e.g. ['model.optimizer', 'data.paths'].
+				Everything else is skipped while parsing.
+			cache: reuse the parsed data of earlier loads of the unchanged file, see CONFIG["cache_dir"]
+		"""
 		path = Path(path)
 		if path.stat().st_size == 0:
 			return Dictoo({})
-		if path.name.endswith(".json"):
-			return Dictoo.from_json(path)
-		elif path.name.endswith(".yaml"):
-			return Dictoo.from_yaml(path)
-		else:
-			raise ValueError("Can only load from json or yaml")
+		read, _ = _format(path)
+		return Dictoo(_load(path, read, select, cache), __lazy=lazy)
+
+	@staticmethod
+	def from_files(paths: str | Sequence[str | Path], workers: int | None = None, executor: Any = "thread", merge: bool = False, lazy: bool = False, select: Sequence[str] | None = None, cache: bool = False):
+		"""Loads many json or yaml files concurrently.
+
+		Args:
+			paths: the files or a glob pattern, e.g. 'conf/**/*.yaml'
+			workers: the maximum number of concurrent loads
+			executor: "thread", "process" or an Executor. Use "process" when parsing, not reading, dominates.
+			merge: update one Dictoo with the files in the given order instead of returning them by path
+			lazy, select, cache: see `from_file`
+		Return:
+			a dict from each path to its Dictoo, or the merged Dictoo
+		"""
+		from .op import _open_executor
+		import glob
+
+		if isinstance(paths, (str, Path)):
+			pattern = str(paths)
+			paths = sorted(glob.glob(pattern, recursive=True))
+			if len(paths) == 0:
+				raise FileNotFoundError("No files match {}".format(pattern))
+
+		with _open_executor(executor, workers) as pool:
+			futures = [pool.submit(Dictoo.from_file, p, lazy, select, cache) for p in paths]
+			loaded = {str(p): f.result() for p, f in zip(paths, futures)}
+
+		if not merge:
+			return loaded
+		res = Dictoo({}, __lazy=lazy)
+		for d in loaded.values():
+			res.update(d)
+		return res
+
+	@staticmethod
+	async def from_file_async(path: str | Path, lazy: bool = False, select: Sequence[str] | None = None, cache: bool = False, executor: Any = None):
+		"""Loads a json or yaml file in an executor without blocking the event loop, see `from_file`.
+
+		Args:
+			executor: the Executor to parse in, defaults to the default executor of the loop
+		"""
+		import asyncio, functools
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(executor, functools.partial(Dictoo.from_file, path, lazy, select, cache))
+
+	@staticmethod
+	def from_flat(flat: Mapping[str, Any]) -> 'Dictoo':
+		"""Builds a nested Dictoo from keys like 'a.b[0].c', the inverse of `flattened`.
+
+		Missing list items before a given index are filled with None. A key
+		whose value would be replaced by the subtree of another key, or the
+		other way around, raises a ValueError regardless of the order.
+		"""
+		from .paths import _parse_path
+
+		delim = CONFIG["delim"]
+		root = None
+		# the paths of the given values, to tell them apart from the None fillers of lists
+		leaves = set()
+		for key, v in flat.items():
+			segments = _parse_path(key, delim)
+			if root is None:
+				root = Dictoo([] if isinstance(segments[0], int) else {})
+			node = root
+			for i, (k, k_next) in enumerate(zip(segments[:-1], segments[1:])):
+				child = _child(node, k)
+				if child is _MISSING or (child is None and segments[:i + 1] not in leaves):
+					child = Dictoo([] if isinstance(k_next, int) else {})
+					_put_flat(node, k, child, key)
+				elif not isinstance(child, (DictooDict, DictooList)):
+					raise ValueError("{} conflicts with the value under a shorter key".format(key))
+				node = child
+			if isinstance(_child(node, segments[-1]), (DictooDict, DictooList)):
+				raise ValueError("{} conflicts with the values under longer keys".format(key))
+			_put_flat(node, segments[-1], node._check_value(v), key)
+			leaves.add(segments)
+		return root if root is not None else Dictoo({})
 
 	### OPERATIONS
 	def rename_key(self, old_key_name, new_key_name):
 		raise NotImplementedError()
 
+	def iter_flattened(self, prefix="") -> Iterator[Tuple[str, Any]]:
+		"""Yields the leaves with keys like 'a.b[0].c' in a single depth-first pass."""
+		delim = CONFIG["delim"]
+		stack = [(prefix, self._iter_keyed())]
+		while stack:
+			prefix, items = stack[-1]
+			for k, v in items:
+				key = prefix + k
+				if isinstance(v, DictooDict):
+					stack.append((key + delim, v._iter_keyed()))
+					break
+				elif isinstance(v, DictooList):
+					stack.append((key, v._iter_keyed()))
+					break
+				yield key, v
+			else:
+				stack.pop()
+
+	def flattened(self, prefix="") -> dict:
+		return dict(self.iter_flattened(prefix))
+
 	def to_plain(self) -> Union[dict, list]:
 		if isinstance(self, DictooDict):
 			return self.to_dict()
@@ -117,51 +668,142 @@ class Dictoo:
 		else:
 			raise RuntimeError("Somewhing went very wrong here!")
 
+	def to_json(self, fp=None, indent: int | str | None = None, default: Callable[[Any], Any] | None = None, **kwargs) -> str | None:
+		"""Writes the Dictoo as json without building a plain copy first.
+
+		Args:
+			fp: a text file to stream to, the json is returned as a string if omitted
+			indent: as in json.dump
+			default: converts leaves that json cannot write, see `dictoo.register_encoder`
+			kwargs: further arguments of json.JSONEncoder, e.g. sort_keys
+		"""
+		from .serialize import to_json
+		return to_json(self, fp, indent=indent, default=default, **kwargs)
+
+	def to_yaml(self, fp=None, default: Callable[[Any], Any] | None = None, **kwargs) -> str | None:
+		"""Writes the Dictoo as yaml event by event, see `to_json`.
+
+		Args:
+			kwargs: further arguments of yaml.emit, e.g. width or allow_unicode
+		"""
+		from .serialize import to_yaml
+		return to_yaml(self, fp, default=default, **kwargs)
+
+	def dump(self, path: str | Path, **kwargs) -> None:
+		"""Streams the Dictoo to a json or yaml file, the inverse of `from_file`."""
+		from .serialize import dump
+		dump(self, path, **kwargs)
+
+	def copy(self) -> 'Dictoo':
+		"""Returns a copy of all dicts and lists of the Dictoo, the leaves are shared."""
+		return _copy_node(self, {})
+
+	def freeze(self) -> 'FrozenDictoo':
+		"""Returns an immutable, hashable copy, see `FrozenDictoo`."""
+		from .frozen import FrozenDictoo
+		return FrozenDictoo(self)
+
+	def unbatch(self) -> 'DictooList':
+		"""Splits a Dictoo of columns, as returned by `DictooList.batch`, back into a list of records."""
+		from .tree import flatten
+		columns, treedef = flatten(self)
+		lens = [len(c) for c in columns]
+		if len(lens) == 0 or min(lens) != max(lens):
+			raise ValueError("Can only unbatch a Dictoo whose leaves have the same length")
+		# 1-d arrays are converted in one go so that the records contain python scalars again
+		columns = [c.tolist() if getattr(c, 'ndim', None) == 1 else list(c) for c in columns]
+		res = Dictoo([])
+		list.extend(res, [treedef.unflatten(leaves) for leaves in zip(*columns)])
+		return res
+
 
 class DictooDict(Dictoo, dict):
+	__slots__ = ('_tree', '_lazy', '_parent')
+
 	def __new__(cls, *args, **kwargs):
-		return dict.__new__(cls, *args, **kwargs)
+		return _new_node(cls, _DEFAULT_TREE)
 	
 	def __init__(self, data: Mapping, **kwargs):
 		# Dictoo.__init__(self, data, **kwargs)
-		# TODO: improve efficiency by replacing internally
+		if self._lazy:
+			# nested dicts and lists are stored as they are and only wrapped on first access
+			dict.update(self, data)
+			self._check_leaves(dict.values(self))
+			return
+		if kwargs.get('__trusted'):
+			# bulk construction without _check_value, only values under delimited keys are checked
+			_trusted_items(self, data, self._tree)
+			return
+
 		for k, v in data.items():
 			self[k] = v
 
-		# if the data mapping contained complex keys with list index syntax [0], [1], etc., we need to parse them and create lists
-		# self._parse_indexes_to_lists()
-
-	# def _parse_indexes_to_lists(self):
-	# 	lists: Mapping[str, List[Tuple[indexes, value]]] = {} # maps the key inder which a list exists to the list of values
-	# 	for k, v in self.items():
-	# 		parts = k.split("[")
-	# 		if len(parts) == 1:
-	# 			# no indexes
-	# 			continue
-	# 		else:
-	# 			key = parts[0]
-	# 			# strip away the trailing ]
-	# 			indexes = [int(part[:-1]) for part in parts[1:]]
-	# 			if key not in lists:
-	# 				lists[key] = []
-	# 			lists[key].append((indexes, v))
-		
 
 	def __setattr__(self, k, v):
 		self.__setitem__(k, v)
 
 	def __getattr__(self, k):
+		if k.startswith('__') and k.endswith('__'):
+			# protocol lookups like __deepcopy__ must not autovivify keys
+			raise AttributeError(k)
 		return self[k]
 
 	def __getitem__(self, k):
-		recursed, item = self._recurse_key(DictooDict.__getitem__, k)
-		if recursed:
-			return item
+		if isinstance(k, str):
+			# plain keys skip the cache of split keys, which many distinct keys would evict
+			delim = CONFIG["delim"]
+			ks = _split_key(k, delim) if delim in k else None
+		elif isinstance(k, tuple):
+			if len(k) == 0:
+				raise ValueError('Cannot recurse with empty key')
+			ks = k
 		else:
-			return dict.__getitem__(self, k)
+			ks = None
+		if ks is not None:
+			if len(ks) > 1:
+				# existing nested items are looked up iteratively, only misses take the recursive path
+				v = _descend(self, ks)
+				if v is not _MISSING:
+					return v
+				return self._recurse_key(DictooDict.__getitem__, k)[1]
+			k = ks[0]
+
+		v = dict.__getitem__(self, k)
+		if isinstance(v, (dict, list)) and not isinstance(v, Dictoo) and self._lazy:
+			v = self._wrap_lazy(v)
+			dict.__setitem__(self, k, v)
+		return v
+
+	def _materialize(self):
+		"""Wraps all direct children of a lazy DictooDict, grandchildren stay lazy."""
+		if not self._lazy:
+			return
+		for k, v in dict.items(self):
+			if isinstance(v, (dict, list)) and not isinstance(v, Dictoo):
+				dict.__setitem__(self, k, self._wrap_lazy(v))
+		object.__setattr__(self, '_lazy', False)
+
+	def values(self):
+		self._materialize()
+		return dict.values(self)
+
+	def items(self):
+		self._materialize()
+		return dict.items(self)
+
+	def get(self, k, default=None):
+		if not dict.__contains__(self, k):
+			return default
+		v = dict.__getitem__(self, k)
+		if isinstance(v, (dict, list)) and not isinstance(v, Dictoo) and self._lazy:
+			v = self._wrap_lazy(v)
+			dict.__setitem__(self, k, v)
+		return v
 
 	def __missing__(self, k):
-		return Dictoo({}, __parent=self, __key=k)
+		# like _check_value, the temporary shares the tree state unless that is indexed
+		tree = self._tree
+		return Dictoo({}, __parent=self, __key=k, __tree=tree if tree.index is None else _tree_for(tree.type))
 
 	def __setitem__(self, k: Union[Tuple, Any], v) -> None:
 		if self._recurse_key(DictooDict.__setitem__, k, v)[0]:
@@ -171,47 +813,39 @@ class DictooDict(Dictoo, dict):
 			k = k[0]
 		
 		v = self._check_value(v)
+		index = self._get_index()
+		if index is not None:
+			index.set(self, k, v)
 		dict.__setitem__(self, k, v)
 
 		# if this is a nested __setitem__ call self might have been created by __missing__.
 		# in this case it has to be attached to the parent
-		try:
-			p = object.__getattribute__(self, '__parent')
-			k = object.__getattribute__(self, '__key')
-		except AttributeError:
-			p = None
-			k = None
-		
-		if p is not None and k is not None:
+		parent = self._parent
+		if parent is not None:
 			# this setitem will trigger an upwards recursion setting every intermediately created dictoo on its parent until the root
+			object.__setattr__(self, '_parent', None)
+			p, k = parent
 			p[k] = self
-			object.__delattr__(self, '__parent')
-			object.__delattr__(self, '__key')
 
 	def __delattr__(self, key: str) -> None:
 		return self.__delitem__(key)
 
 	def __delitem__(self, k) -> None:
 		if not self._recurse_key(DictooDict.__delitem__, k)[0]:
+			if isinstance(k, tuple) and len(k) == 1:
+				k = k[0]
+			index = self._get_index()
+			if index is not None and k in self:
+				index.delete(self, k)
 			return dict.__delitem__(self, k)
 
-	def flattened(self, prefix="") -> dict:
-		base = {}
-		delim = CONFIG["delim"]
-		for key, value in self.items():
-			if isinstance(value, DictooDict):
-				for k, v in value.flattened(prefix=prefix + key + delim).items():
-					base[k] = v
-			elif isinstance(value, DictooList):
-				for k, v in value.flattened(prefix=prefix + key).items():
-					base[k] = v
-			else:
-				base[prefix + key] = value
-		return base
+	def _iter_keyed(self) -> Iterator[Tuple[str, Any]]:
+		return ((str(k), v) for k, v in self.items())
 
 	def to_dict(self) -> dict:
 		base = {}
-		for k, v in self.items():
+		# dict.items does not wrap lazy children, untouched subtrees are returned as they are
+		for k, v in dict.items(self):
 			if isinstance(v, Dictoo):
 				base[k] = v.to_plain()
 			else:
@@ -248,10 +882,14 @@ class DictooDict(Dictoo, dict):
 				v = self._check_value(v)
 				self[k] = v	
 
-	def __getnewargs__(self):
-		return (self.to_dict(),)
-
 	def search(self, key):
+		index = self._get_index()
+		if index is not None:
+			res = index.search(self, key)
+			if len(res) == 0:
+				raise KeyError(key)
+			return res[0][1]
+
 		for k, v in self.items():
 			if isinstance(v, Dictoo):
 				try:
@@ -262,16 +900,39 @@ class DictooDict(Dictoo, dict):
 				return v
 		raise KeyError()
 
-	def search_all(self, key):
-		raise NotImplementedError()
+	def search_all(self, key) -> List[Tuple[Tuple, Any]]:
+		"""Returns the path and value of every item under key, in the order in which `search` finds them."""
+		index = self._get_index()
+		if index is not None:
+			return index.search(self, key)
+		res = []
+		self._search_all(key, (), res)
+		return res
+
+	def _search_all(self, key, path: Tuple, res: List[Tuple[Tuple, Any]]):
+		for k, v in self.items():
+			if isinstance(v, Dictoo):
+				v._search_all(key, path + (k,), res)
+			if k == key:
+				res.append((path + (k,), v))
 
 class DictooList(Dictoo, list):
-	def __new__(cls, args: List, **kwargs):
-		return list.__new__(cls, *args, **kwargs)
+	__slots__ = ('_tree', '_lazy', '_parent')
+
+	def __new__(cls, *args, **kwargs):
+		return _new_node(cls, _DEFAULT_TREE)
 	
 	def __init__(self, data: List, **kwargs):
 		# Dictoo.__init__(self, data, **kwargs)
-		# TODO: try to replace the list internally
+		if self._lazy:
+			# nested dicts and lists are stored as they are and only wrapped on first access
+			list.extend(self, data)
+			self._check_leaves(list.__iter__(self))
+			return
+		if kwargs.get('__trusted'):
+			list.extend(self, [_trusted(v, self._tree) for v in data])
+			return
+
 		for x in data:
 			self.append(x)
 
@@ -282,7 +943,17 @@ class DictooList(Dictoo, list):
 		v = self._check_value(v)
 		
 		try:
-			list.__setitem__(self, idx, v)
+			index = self._get_index()
+			if index is not None and isinstance(idx, int):
+				old = list.__getitem__(self, idx)
+				list.__setitem__(self, idx, v)
+				index.remove(old)
+				index.add(v, index.path_of(self) + (idx % len(self),))
+				index.touch(index.path_of(self) + (idx % len(self),))
+			elif index is not None:
+				index.reindex_list(self, list.__setitem__, idx, v)
+			else:
+				list.__setitem__(self, idx, v)
 		except TypeError:
 			try:
 				for x in self:
@@ -291,54 +962,76 @@ class DictooList(Dictoo, list):
 				raise IndexError("The index {} is neither an index to the list nor a key to the items in the list.")
 
 	def __getitem__(self, key: Union[int, slice, Any]):
+		"""Returns the stored items, slices and columns share them with this list, nothing is copied."""
 		if isinstance(key, tuple):
 			k = key[0]
-			if isinstance(k, slice):
-				return DictooList([x[key[1:]] for x in list.__getitem__(self, k)])
+			if len(key) == 1:
+				return self[k]
+			elif isinstance(k, slice):
+				return self._view([x[key[1:]] for x in self[k]])
 			else:
-				return list.__getitem__(self, k)[key[1:]]
+				return self[k][key[1:]]
 		elif isinstance(key, int):
 			r = list.__getitem__(self, key)
+			if isinstance(r, (dict, list)) and not isinstance(r, Dictoo) and self._lazy:
+				r = self._wrap_lazy(r)
+				list.__setitem__(self, key, r)
+			return r
 		elif isinstance(key, slice):
-			r = list.__getitem__(self, key)
+			if self._lazy:
+				# wrap the sliced items in place so that writes to them reach this list
+				for i in range(*key.indices(len(self))):
+					self[i]
+			return self._view(list.__getitem__(self, key))
 		else:
 			# if the key is obviously not an index into the list, try
 			# to use it as a key for all dicts in the list(s)
-			return DictooList([x[key] if isinstance(x, Dictoo) else None for x in self])
-		
-		if isinstance(r, dict):
-			return DictooDict(r)
-		elif isinstance(r, list):
-			return DictooList(r)
-		else:
-			return r
+			return self._view([x[key] if isinstance(x, Dictoo) else None for x in self])
+
+	def _view(self, items: List) -> 'DictooList':
+		# a new list of the given items without copying or checking them again
+		tree = self._tree
+		view = _new_node(DictooList, tree if tree.index is None else _tree_for(tree.type))
+		list.extend(view, items)
+		return view
+
+	def _materialize(self):
+		"""Wraps all direct children of a lazy DictooList, grandchildren stay lazy."""
+		if not self._lazy:
+			return
+		for i, v in enumerate(list.__iter__(self)):
+			if isinstance(v, (dict, list)) and not isinstance(v, Dictoo):
+				list.__setitem__(self, i, self._wrap_lazy(v))
+		object.__setattr__(self, '_lazy', False)
+
+	def __iter__(self):
+		self._materialize()
+		return list.__iter__(self)
 
 	def append(self, v) -> None:
 		v = self._check_value(v)
 		list.append(self, v)
+		index = self._get_index()
+		if index is not None:
+			index.add(v, index.path_of(self) + (len(self) - 1,))
+			index.touch(index.path_of(self) + (len(self) - 1,), exists=True)
 
 	def __delitem__(self, i: Union[SupportsIndex, slice]) -> None:
+		index = self._get_index()
+		if index is not None:
+			return index.reindex_list(self, list.__delitem__, i)
 		return list.__delitem__(self, i)
 	
 	def insert(self, idx: SupportsIndex, v) -> None:
 		v = self._check_value(v)
-		return list.insert(idx, v)
+		index = self._get_index()
+		if index is not None:
+			return index.reindex_list(self, list.insert, idx, v)
+		return list.insert(self, idx, v)
+
+	def _iter_keyed(self) -> Iterator[Tuple[str, Any]]:
+		return (('[' + str(i) + ']', v) for i, v in enumerate(self))
 
-	def flattened(self, prefix="") -> dict:
-		base = {}
-		delim = CONFIG["delim"]
-		for idx, value in enumerate(self):
-			key = '['+str(idx)+']'
-			if isinstance(value, DictooDict):
-				for k, v in value.flattened(prefix=prefix + key + delim).items():
-					base[k] = v
-			elif isinstance(value, DictooList):
-				for k, v in value.flattened(prefix=prefix + key).items():
-					base[k] = v
-			else:
-				base[prefix + key] = value
-		return base
-	
 	def flattened_list(self) -> list:
 		base = []
 		for idx, value in enumerate(self):
@@ -351,7 +1044,8 @@ class DictooList(Dictoo, list):
 
 	def to_list(self) -> list:
 		base = []
-		for x in self:
+		# list.__iter__ does not wrap lazy children, untouched subtrees are returned as they are
+		for x in list.__iter__(self):
 			if isinstance(x, Dictoo):
 				base.append(x.to_plain())
 			else:
@@ -382,6 +1076,13 @@ class DictooList(Dictoo, list):
 				self[i] = xx
 
 	def search(self, key):
+		index = self._get_index()
+		if index is not None:
+			res = index.search(self, key)
+			if len(res) == 0:
+				raise KeyError(key)
+			return res[0][1]
+
 		for v in self:
 			if isinstance(v, Dictoo):
 				try:
@@ -391,12 +1092,219 @@ class DictooList(Dictoo, list):
 					pass
 		raise KeyError()
 
-	def search_all(self, key):
-		raise NotImplementedError()
+	def search_all(self, key) -> List[Tuple[Tuple, Any]]:
+		"""Returns the path and value of every item under key, in the order in which `search` finds them."""
+		index = self._get_index()
+		if index is not None:
+			return index.search(self, key)
+		res = []
+		self._search_all(key, (), res)
+		return res
+
+	def _search_all(self, key, path: Tuple, res: List[Tuple[Tuple, Any]]):
+		for i, v in enumerate(self):
+			if isinstance(v, Dictoo):
+				v._search_all(key, path + (i,), res)
+
+	def batch(self) -> DictooDict:
+		"""Stacks a list of Dictoos with the same structure into one Dictoo of columns.
+
+		Numeric leaves are stacked into numpy arrays along a new first axis,
+		all other leaves are collected in python lists.
+		"""
+		import numpy as np
+		from .tree import flatten
+
+		if len(self) == 0:
+			raise ValueError("Cannot batch an empty DictooList")
+		records = list(self)
+		_, treedef = flatten(records[0])
+		leaves = [treedef.flatten(r) for r in records]
+		return treedef.unflatten([_stack_column(np, column) for column in zip(*leaves)])
+
+def _stack_column(np, column: Sequence) -> Any:
+	try:
+		stacked = np.stack(column)
+	except ValueError:
+		# leaves with different shapes
+		return list(column)
+	if stacked.dtype.kind not in 'biufcmM':
+		return list(column)
+	return stacked
+
+def _put_flat(node: Dictoo, k: Union[str, int], v: Any, key: str):
+	# stores a value built by from_flat without checking it again
+	if isinstance(node, DictooDict) and isinstance(k, str):
+		dict.__setitem__(node, k, v)
+	elif isinstance(node, DictooList) and isinstance(k, int):
+		if k >= len(node):
+			list.extend(node, [None] * (k - len(node) + 1))
+		list.__setitem__(node, k, v)
+	else:
+		raise ValueError("{} mixes list indexes and keys on the same level".format(key))
+
+class _KeyIndex:
+	"""Inverted index from key names to the paths under which they occur in a Dictoo.
+
+	All indexed nodes share a _DictooTree that refers to the index, and the
+	index keeps the path of every node, so that mutations of nested nodes can
+	update the index without a search from the root.
+	"""
+
+	def __init__(self, type: Union[Type, None] = None):
+		self.tree = _DictooTree(type)
+		self.tree.index = self
+		self.paths: Dict[Any, set] = {}
+		self.node_paths: Dict[int, Tuple] = {}
+		self.changes: Union[_ChangeLog, None] = None
+
+	def path_of(self, node: Dictoo) -> Tuple:
+		return self.node_paths[id(node)]
+
+	def touch(self, path: Tuple, exists: Union[bool, None] = None):
+		if self.changes is not None:
+			self.changes.touch(path, exists)
+
+	def add(self, node: Any, path: Tuple):
+		"""Indexes a node stored under path and everything below it."""
+		if not isinstance(node, Dictoo):
+			return
+		object.__setattr__(node, '_tree', self.tree)
+		self.node_paths[id(node)] = path
+		if isinstance(node, DictooDict):
+			for k, v in node.items():
+				self.paths.setdefault(k, set()).add(path + (k,))
+				self.add(v, path + (k,))
+		else:
+			for i, v in enumerate(node):
+				self.add(v, path + (i,))
+
+	def remove(self, node: Any, detached: Union[_DictooTree, None] = None):
+		"""Removes a node and everything below it from the index."""
+		if not isinstance(node, Dictoo) or node._tree is not self.tree:
+			return
+		if detached is None:
+			detached = _tree_for(self.tree.type)
+		path = self.node_paths.pop(id(node))
+		object.__setattr__(node, '_tree', detached)
+		if isinstance(node, DictooDict):
+			for k, v in dict.items(node):
+				self._discard(k, path + (k,))
+				self.remove(v, detached)
+		else:
+			for v in list.__iter__(node):
+				self.remove(v, detached)
+
+	def _discard(self, k, path: Tuple):
+		paths = self.paths.get(k)
+		if paths is not None:
+			paths.discard(path)
+			if len(paths) == 0:
+				del self.paths[k]
+
+	def set(self, node: DictooDict, k, v):
+		old = dict.get(node, k, _MISSING)
+		if old is not _MISSING:
+			self.remove(old)
+		path = self.path_of(node) + (k,)
+		self.paths.setdefault(k, set()).add(path)
+		self.add(v, path)
+		self.touch(path, exists=True if old is _MISSING else None)
+
+	def delete(self, node: DictooDict, k):
+		self.remove(dict.__getitem__(node, k))
+		self._discard(k, self.path_of(node) + (k,))
+		self.touch(self.path_of(node) + (k,), exists=False)
+
+	def reindex_list(self, node: DictooList, mutate: Callable, *args):
+		"""Applies a mutation that can shift the items of a list and reindexes the items."""
+		for v in list.__iter__(node):
+			self.remove(v)
+		try:
+			return mutate(node, *args)
+		finally:
+			path = self.path_of(node)
+			for i, v in enumerate(list.__iter__(node)):
+				self.add(v, path + (i,))
+			# the items may have shifted, the whole list changed
+			self.touch(path)
+
+	def search(self, node: Dictoo, key) -> List[Tuple[Tuple, Any]]:
+		prefix = self.path_of(node)
+		res = []
+		for p in [p for p in self.paths.get(key, ()) if p[:len(prefix)] == prefix]:
+			v = _descend(node, p[len(prefix):])
+			if v is _MISSING:
+				# removed by a mutation that is not tracked, e.g. dict.pop
+				self._discard(key, p)
+			else:
+				res.append((p[len(prefix):], v))
+		if len(res) > 1:
+			order = self._search_order(node)
+			res.sort(key=lambda match: order(match[0]))
+		return res
+
+	@staticmethod
+	def _search_order(root: Dictoo) -> Callable[[Tuple], List]:
+		"""Sorts paths in the order of the depth-first search, nested matches come before their parents."""
+		positions = {}
+
+		def order(path: Tuple) -> List:
+			res = []
+			node = root
+			for k in path:
+				if isinstance(node, DictooDict):
+					if id(node) not in positions:
+						positions[id(node)] = {kk: i for i, kk in enumerate(node)}
+					res.append(positions[id(node)][k])
+				else:
+					res.append(k)
+				node = _child(node, k)
+			res.append(float('inf'))
+			return res
+		return order
+
+class _ChangeLog:
+	"""The version at which each path was last modified, kept by the _KeyIndex of a tracked Dictoo."""
+	__slots__ = ('version', 'dirty', 'existence')
+
+	def __init__(self):
+		self.version = 0
+		self.dirty: Dict[Tuple, int] = {}
+		# (version, exists afterwards) of every creation and deletion of a dict key or appended list item
+		self.existence: Dict[Tuple, List[Tuple[int, bool]]] = {}
+
+	def touch(self, path: Tuple, exists: Union[bool, None] = None):
+		"""Records a modification of path, exists is True for a creation and False for a deletion."""
+		self.version += 1
+		self.dirty[path] = self.version
+		if exists is not None:
+			self.existence.setdefault(path, []).append((self.version, exists))
+
+	def existed_at(self, path: Tuple, token: int) -> bool:
+		events = self.existence.get(path)
+		if not events:
+			return True
+		res = not events[0][1]
+		for version, exists in events:
+			if version > token:
+				break
+			res = exists
+		return res
+
+	def since(self, token: int) -> List[Tuple]:
+		"""Returns the paths modified after token, without the paths below another modified path."""
+		changed = {p for p, version in self.dirty.items() if version > token}
+		res = [p for p in changed if not any(p[:i] in changed for i in range(len(p)))]
+		# list indexes are sorted numerically, so that appended items are in order
+		res.sort(key=lambda p: [(0, k) if isinstance(k, int) else (1, str(k)) for k in p])
+		return res
 
 class DictooEmpty(Dictoo):
+	__slots__ = ('_tree', '_lazy', '_parent')
+
 	def __new__(cls, *args, **kwargs):
-		return object.__new__(cls, *args, **kwargs)
+		return _new_node(cls, _DEFAULT_TREE)
 
 	def __init__(self):
 		pass
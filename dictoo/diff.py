@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, Tuple, Union
+
+from .dictoo import Dictoo, DictooList, _MISSING, _child
+from .frozen import FrozenDictoo
+
+
+def _escape(k: Any) -> str:
+	return str(k).replace('~', '~0').replace('/', '~1')
+
+def _unescape(segment: str) -> str:
+	return segment.replace('~1', '/').replace('~0', '~')
+
+def _plain(v: Any) -> Any:
+	return v.to_plain() if isinstance(v, Dictoo) else v
+
+def _leaf_equal(a: Any, b: Any) -> bool:
+	if type(a) is not type(b):
+		return False
+	try:
+		return bool(a == b)
+	except ValueError:
+		# elementwise comparisons, e.g. of numpy arrays
+		return getattr(a, 'shape', None) == getattr(b, 'shape', None) and bool((a == b).all())
+
+def _diff(a: Any, b: Any, path: str, ops: List[Dict[str, Any]]):
+	if a is b:
+		return
+	if isinstance(a, FrozenDictoo) and isinstance(b, FrozenDictoo):
+		try:
+			# the hashes are cached, unequal subtrees are detected without a comparison
+			if hash(a) == hash(b) and a == b:
+				return
+		except TypeError:
+			pass
+
+	if isinstance(a, dict) and isinstance(b, dict):
+		# dict methods are used directly so that lazy Dictoos are compared without wrapping their children
+		for k, v in dict.items(a):
+			w = dict.get(b, k, _MISSING)
+			if w is _MISSING:
+				ops.append({'op': 'remove', 'path': path + '/' + _escape(k)})
+			else:
+				_diff(v, w, path + '/' + _escape(k), ops)
+		for k, w in dict.items(b):
+			if not dict.__contains__(a, k):
+				ops.append({'op': 'add', 'path': path + '/' + _escape(k), 'value': _plain(w)})
+
+	elif isinstance(a, list) and isinstance(b, list):
+		n = min(len(a), len(b))
+		for i, v, w in zip(range(n), list.__iter__(a), list.__iter__(b)):
+			_diff(v, w, path + '/' + str(i), ops)
+		for i in range(n, len(b)):
+			ops.append({'op': 'add', 'path': path + '/' + str(i), 'value': _plain(list.__getitem__(b, i))})
+		# remove from the back so that the indexes stay valid while patching
+		for i in reversed(range(n, len(a))):
+			ops.append({'op': 'remove', 'path': path + '/' + str(i)})
+
+	elif isinstance(a, (dict, list)) or isinstance(b, (dict, list)) or not _leaf_equal(a, b):
+		ops.append({'op': 'replace', 'path': path, 'value': _plain(b)})
+
+def diff(a: Dictoo, b: Dictoo) -> List[Dict[str, Any]]:
+	"""Returns the JSON-Patch operations that turn a into b.
+
+	Subtrees that are shared by a and b, and FrozenDictoo subtrees with equal
+	hashes, are skipped, so the cost scales with the size of the change.
+	List items are compared by position.
+	"""
+	ops = []
+	_diff(a, b, '', ops)
+	return ops
+
+def _parse_pointer(pointer: str) -> Tuple[str, ...]:
+	if pointer == '':
+		return ()
+	if not pointer.startswith('/'):
+		raise ValueError("invalid JSON pointer {}".format(pointer))
+	return tuple(_unescape(s) for s in pointer[1:].split('/'))
+
+def _key(node: Any, segment: str) -> Union[str, int]:
+	if isinstance(node, list):
+		return len(node) if segment == '-' else int(segment)
+	if segment not in node and segment.isdigit() and int(segment) in node:
+		return int(segment)
+	return segment
+
+def _replace_root(d: Dictoo, op: Dict[str, Any]) -> None:
+	# the root is replaced in place by a value of the same kind, so that references to d stay valid
+	v = op.get('value')
+	if op['op'] != 'replace' or not isinstance(v, (dict, list)) or isinstance(v, dict) != isinstance(d, dict):
+		raise ValueError("Cannot patch the root of a Dictoo in place")
+	if isinstance(d, DictooList):
+		del d[:]
+		for x in v:
+			d.append(x)
+	else:
+		for k in list(dict.keys(d)):
+			del d[(k,)]
+		for k, x in v.items():
+			d[(k,)] = x
+
+def patch(d: Dictoo, ops: List[Dict[str, Any]]) -> Dictoo:
+	"""Applies JSON-Patch add, remove and replace operations to d in place."""
+	for op in ops:
+		segments = _parse_pointer(op['path'])
+		if len(segments) == 0:
+			_replace_root(d, op)
+			continue
+		node = d
+		for segment in segments[:-1]:
+			node = _child(node, _key(node, segment))
+			if node is _MISSING:
+				raise KeyError(op['path'])
+		k = _key(node, segments[-1])
+		# a 1-tuple addresses dict keys that contain the delimiter literally
+		item = k if isinstance(node, list) else (k,)
+
+		if op['op'] == 'add' and isinstance(node, DictooList):
+			node.insert(k, op['value'])
+		elif op['op'] in ('add', 'replace'):
+			node[item] = op['value']
+		elif op['op'] == 'remove':
+			del node[item]
+		else:
+			raise ValueError("unsupported patch operation {}".format(op['op']))
+	return d
@@ -0,0 +1,165 @@
+from typing import Any, Iterable, Mapping, Tuple, Union
+
+from .dictoo import Dictoo, DictooDict, DictooList, _DEFAULT_TREE, _MISSING, _child, _new_node
+
+
+class FrozenDictoo:
+	"""An immutable, hashable Dictoo.
+
+	`set_in` and `delete_in` return a new FrozenDictoo that shares every
+	untouched subtree with the original one, so a snapshot costs a copy of
+	the nodes along one path instead of a copy of the tree. Every node caches
+	its content hash, which makes unequal trees compare in O(1) once hashed.
+	"""
+	__slots__ = ()
+
+	def __new__(cls, data=None):
+		return _freeze({} if data is None else data)
+
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __hash__(self) -> int:
+		h = self._hash
+		if h is None:
+			h = self._content_hash()
+			object.__setattr__(self, '_hash', h)
+		return h
+
+	def __eq__(self, other) -> bool:
+		if self is other:
+			return True
+		if isinstance(other, FrozenDictoo):
+			try:
+				if hash(self) != hash(other):
+					return False
+			except TypeError:
+				# unhashable leaves, e.g. numpy arrays
+				pass
+		return super().__eq__(other)
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def copy(self):
+		return self
+
+	def set_in(self, path: Union[str, tuple], v: Any) -> 'FrozenDictoo':
+		"""Returns a copy with v stored under path, missing intermediate dicts are created."""
+		from .paths import path as compile_path
+		return _set_in(self, compile_path(path).segments, _freeze(v))
+
+	def delete_in(self, path: Union[str, tuple]) -> 'FrozenDictoo':
+		"""Returns a copy without the item under path."""
+		from .paths import path as compile_path
+		return _set_in(self, compile_path(path).segments, _MISSING)
+
+	def thaw(self) -> Dictoo:
+		"""Returns a mutable deep copy."""
+		return Dictoo(self.to_plain())
+
+	def _immutable(self, *args, **kwargs):
+		raise TypeError("{} is immutable".format(type(self).__name__))
+
+	__setitem__ = __delitem__ = __setattr__ = __delattr__ = _immutable
+	update = pop = popitem = clear = setdefault = __ior__ = _immutable
+	append = extend = insert = remove = sort = reverse = __iadd__ = __imul__ = _immutable
+	set_type = build_index = _immutable
+
+
+class FrozenDictooDict(FrozenDictoo, DictooDict):
+	__slots__ = ('_hash',)
+
+	def __missing__(self, k):
+		raise KeyError(k)
+
+	def __getattr__(self, k):
+		try:
+			return DictooDict.__getattr__(self, k)
+		except KeyError:
+			raise AttributeError(k)
+
+	def _content_hash(self) -> int:
+		return hash((FrozenDictooDict, frozenset(dict.items(self))))
+
+	def __reduce_ex__(self, protocol):
+		return (_frozen_dict, (dict(dict.items(self)),))
+
+
+class FrozenDictooList(FrozenDictoo, DictooList):
+	__slots__ = ('_hash',)
+
+	def __getitem__(self, key):
+		if isinstance(key, int):
+			return list.__getitem__(self, key)
+		elif isinstance(key, slice):
+			return _frozen_list(list.__getitem__(self, key))
+		return _freeze(DictooList.__getitem__(self, key))
+
+	def _content_hash(self) -> int:
+		return hash((FrozenDictooList, tuple(list.__iter__(self))))
+
+	def __reduce_ex__(self, protocol):
+		return (_frozen_list, (list(list.__iter__(self)),))
+
+
+def _frozen_dict(items: Mapping) -> FrozenDictooDict:
+	node = _new_node(FrozenDictooDict, _DEFAULT_TREE)
+	object.__setattr__(node, '_hash', None)
+	dict.update(node, items)
+	return node
+
+def _frozen_list(items: Iterable) -> FrozenDictooList:
+	node = _new_node(FrozenDictooList, _DEFAULT_TREE)
+	object.__setattr__(node, '_hash', None)
+	list.extend(node, items)
+	return node
+
+def _freeze(v: Any) -> Any:
+	if isinstance(v, FrozenDictoo):
+		return v
+	elif isinstance(v, dict):
+		# dict.items does not wrap the children of lazy Dictoos, they are frozen directly
+		return _frozen_dict({k: _freeze(x) for k, x in dict.items(v)})
+	elif isinstance(v, Mapping):
+		return _frozen_dict({k: _freeze(x) for k, x in v.items()})
+	elif isinstance(v, list):
+		return _frozen_list([_freeze(x) for x in list.__iter__(v)])
+	return v
+
+def _set_in(node: FrozenDictoo, segments: Tuple, v: Any) -> FrozenDictoo:
+	"""Copies the nodes along segments, v is _MISSING to delete."""
+	k = segments[0]
+	if len(segments) == 1:
+		new_child = v
+	else:
+		child = _child(node, k)
+		if child is _MISSING:
+			if v is _MISSING:
+				raise KeyError(k)
+			if not isinstance(node, FrozenDictooDict):
+				raise IndexError("{} is not a valid index".format(k))
+			child = _frozen_dict({})
+		elif not isinstance(child, FrozenDictoo):
+			raise TypeError("Cannot descend into the leaf under {}".format(k))
+		new_child = _set_in(child, segments[1:], v)
+
+	if isinstance(node, FrozenDictooDict):
+		items = dict(dict.items(node))
+		if new_child is _MISSING:
+			del items[k]
+		else:
+			items[k] = new_child
+		return _frozen_dict(items)
+
+	if not isinstance(k, int):
+		raise IndexError("{} is not a valid index".format(k))
+	items = list(list.__iter__(node))
+	if new_child is _MISSING:
+		del items[k]
+	else:
+		items[k] = new_child
+	return _frozen_list(items)
@@ -1,7 +1,11 @@
-from .dictoo import Dictoo, DictooDict, DictooList
-from typing import Callable, Any, List, Dict, Union
-
-def apply(op: Callable, *op_args: Dictoo, _dictoo_apply_is_leaf_rule: Union[Callable[[Any], bool], None] = None, _dictoo_apply_nested_key: List[str] = [], _dictoo_pass_key=False, **op_kwargs: Any) -> Dictoo:
+from .dictoo import CONFIG, Dictoo, DictooDict, DictooList
+from .tree import TreeDef, flatten
+from contextlib import contextmanager
+from typing import Callable, Any, List, Dict, Tuple, Union
+import math
+import os
+
+def apply(op: Callable, *op_args: Dictoo, _dictoo_apply_is_leaf_rule: Union[Callable[[Any], bool], None] = None, _dictoo_apply_nested_key: List[str] = [], _dictoo_pass_key=False, _dictoo_treedef: Union[TreeDef, None] = None, _dictoo_executor: Union[str, 'Executor', None] = None, _dictoo_chunksize: Union[int, None] = None, **op_kwargs: Any) -> Dictoo:
 	"""Apply an n-ary operation to n dicts.
 
 	The Dictoos need to either provide defaults or have a matching structure.
@@ -9,8 +13,29 @@ def apply(op: Callable, *op_args: Dictoo, _dictoo_apply_is_leaf_rule: Union[Call
 
 	Args:
 		op (Callable): the callable that works under 
+		_dictoo_treedef (TreeDef): the structure of the op_args as returned by `flatten`.
+			When given, the structure is not rediscovered on every call.
+		_dictoo_executor (str | Executor): "thread", "process" or an Executor to call the op concurrently.
+			The results are rebuilt in the original structure and order. If the op_args do not
+			have the same structure, the op is called serially.
+		_dictoo_chunksize (int): the number of leaves per scheduled task.
 	Retrusn: 
 	"""
+	leaves = None
+	if _dictoo_treedef is not None:
+		leaves = [_dictoo_treedef.flatten(op_arg) for op_arg in op_args]
+	elif _dictoo_executor is not None and isinstance(op_args[0], (DictooDict, DictooList)):
+		first, treedef = flatten(op_args[0], is_leaf=_dictoo_apply_is_leaf_rule)
+		try:
+			leaves = [first] + [treedef.flatten(op_arg) for op_arg in op_args[1:]]
+			_dictoo_treedef = treedef
+		except ValueError:
+			# op_args with different structures are applied recursively, like without an executor
+			pass
+	if leaves is not None:
+		pass_key = _dictoo_apply_is_leaf_rule is not None or _dictoo_pass_key
+		return _apply_flat(op, leaves, _dictoo_treedef, pass_key, op_kwargs, _dictoo_executor, _dictoo_chunksize)
+
 	if _dictoo_apply_is_leaf_rule and _dictoo_apply_is_leaf_rule(op_args[0]):
 		res = op(*op_args, _dictoo_key=_dictoo_apply_nested_key, **op_kwargs)
 	
@@ -46,14 +71,71 @@ def apply(op: Callable, *op_args: Dictoo, _dictoo_apply_is_leaf_rule: Union[Call
 	
 	return res
 
-def foreach(op: Callable[[any, List[Union[int,str]]], None], data: any, key: List[Union[int, str]] = []) -> None:
+def _apply_flat(op: Callable, leaves: List[List[Any]], treedef: TreeDef, pass_key: bool, op_kwargs: Dict[str, Any], executor: Union[str, 'Executor', None] = None, chunksize: Union[int, None] = None) -> Dictoo:
+	keys = [list(key) for key in treedef.paths(index=str)] if pass_key else None
+	# the results are untyped like those of the recursive apply
+	return treedef.unflatten(_map_leaves(op, list(zip(*leaves)), keys, op_kwargs, executor, chunksize), typed=False)
+
+def _call_chunk(op: Callable, args: List[Tuple], keys: Union[List, None], op_kwargs: Dict[str, Any]) -> List[Any]:
+	if keys is None:
+		return [op(*xs, **op_kwargs) for xs in args]
+	return [op(*xs, _dictoo_key=key, **op_kwargs) for key, xs in zip(keys, args)]
+
+def _num_workers() -> int:
+	# the workers of an Executor that was passed in are not known, the setting is used for all pools
+	return CONFIG["parallel_workers"] or os.cpu_count() or 1
+
+@contextmanager
+def _open_executor(executor: Union[str, 'Executor'], max_workers: Union[int, None] = None):
+	# concurrent.futures is only imported when an executor is used
+	from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+	if isinstance(executor, Executor):
+		yield executor
+		return
+	if max_workers is None:
+		max_workers = CONFIG["parallel_workers"]
+	if executor == "thread":
+		pool = ThreadPoolExecutor(max_workers)
+	elif executor == "process":
+		pool = ProcessPoolExecutor(max_workers)
+	else:
+		raise ValueError("executor must be 'thread', 'process' or an Executor, got {}".format(executor))
+	with pool:
+		yield pool
+
+def _map_leaves(op: Callable, args: List[Tuple], keys: Union[List, None], op_kwargs: Dict[str, Any], executor: Union[str, 'Executor', None], chunksize: Union[int, None]) -> List[Any]:
+	"""Calls the op for every leaf, concurrently if an executor is given and the tree is large enough."""
+	if executor is None or len(args) < CONFIG["parallel_min_leaves"]:
+		return _call_chunk(op, args, keys, op_kwargs)
+
+	with _open_executor(executor) as pool:
+		if chunksize is None:
+			workers = _num_workers()
+			chunksize = max(1, math.ceil(len(args) / (4 * workers)))
+		futures = [
+			pool.submit(_call_chunk, op, args[i:i + chunksize], keys[i:i + chunksize] if keys is not None else None, op_kwargs)
+			for i in range(0, len(args), chunksize)
+		]
+		res = []
+		for f in futures:
+			res += f.result()
+	return res
+
+def foreach(op: Callable[[any, List[Union[int,str]]], None], data: any, key: List[Union[int, str]] = [], executor: Union[str, 'Executor', None] = None, chunksize: Union[int, None] = None) -> None:
 	"""Iterate over the leaf values and optionally keys of a dictoo.
 
 	Args:
 		op (Callable): the callable that works under 
+		executor (str | Executor): "thread", "process" or an Executor to call the op concurrently.
+		chunksize (int): the number of leaves per scheduled task.
 	Retrusn: 
 	"""
-	if isinstance(data, DictooList):
+	if executor is not None and isinstance(data, (DictooDict, DictooList)):
+		leaves, treedef = flatten(data)
+		prefix = tuple(key)
+		_map_leaves(op, [(leaf, prefix + k) for leaf, k in zip(leaves, treedef.paths())], None, {}, executor, chunksize)
+
+	elif isinstance(data, DictooList):
 		for i in range(len(data)):
 			foreach(op, data[i], key + [i])
 
@@ -65,7 +147,7 @@ def foreach(op: Callable[[any, List[Union[int,str]]], None], data: any, key: Lis
 		op(data, tuple(key))
 
 
-def reduce(op, values: List, **op_kwargs):
+def reduce(op, values: List, _dictoo_treedef: Union[TreeDef, None] = None, **op_kwargs):
 	"""Reduce an array of dictoos with a reduction operator.
 
 	The Dictoos need to either provide defaults or have a matching structure.
@@ -73,8 +155,14 @@ def reduce(op, values: List, **op_kwargs):
 
 	Args:
 		op (Callable): the callable that works under 
+		_dictoo_treedef (TreeDef): the structure of the values as returned by `flatten`.
+			When given, the structure is not rediscovered on every call.
 	Return: 
 	"""
+	if _dictoo_treedef is not None:
+		leaves = [_dictoo_treedef.flatten(v) for v in values]
+		return _dictoo_treedef.unflatten([op(list(xs), **op_kwargs) for xs in zip(*leaves)], typed=False)
+
 	if isinstance(values[0], DictooList):
 		res = DictooList([])
 		lens = [len(x) for x in values]
@@ -94,35 +182,12 @@ def reduce(op, values: List, **op_kwargs):
 	
 
 def slice(d, s: slice, _dictoo_apply_is_leaf_rule: Union[Callable[[Any], bool], None] = None):
-	try:
-		type = object.__getattribute__(d, '__type')
-	except Exception:
-		type = None
-	if isinstance(d, DictooList):
-		base = Dictoo([], __type=type)
-		for value in d:
-			if _dictoo_apply_is_leaf_rule and _dictoo_apply_is_leaf_rule(value):
-				base.append(value[s])
-			elif isinstance(value, Dictoo):
-				base.append(slice(value, s))
-			elif _dictoo_apply_is_leaf_rule is None:
-				base.append(value[s])
-			else:
-				raise RuntimeError()
-		return base
-	elif isinstance(d, DictooDict):
-		base = Dictoo({}, __type=type)
-		for key, value in d.items():
-			if _dictoo_apply_is_leaf_rule and _dictoo_apply_is_leaf_rule(value):
-				base[key] = value[s]
-			elif isinstance(value, DictooDict) or isinstance(value, DictooList):
-				base[key] = slice(value, s)
-			elif _dictoo_apply_is_leaf_rule is None:
-				base[key] = value[s]
-			else:
-				raise RuntimeError()
-	else:
-		raise ValueError()
+	"""Slices every leaf of a Dictoo, e.g. every array of a batch.
 
-	return base
-	
+	The structure is rebuilt once from its TreeDef. Leaves that slice without
+	copying, like numpy arrays, are views into the original leaves.
+	"""
+	if not isinstance(d, (DictooDict, DictooList)):
+		raise ValueError()
+	leaves, treedef = flatten(d, _dictoo_apply_is_leaf_rule)
+	return treedef.unflatten([leaf[s] for leaf in leaves])
@@ -0,0 +1,84 @@
+from functools import lru_cache
+from typing import Any, Tuple, Union
+
+from .dictoo import CONFIG, Dictoo, DictooDict, _MISSING, _child, _descend
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(p: str, delim: str) -> Tuple[Union[str, int], ...]:
+	"""Parses a path like ``a.b[3].c`` into its segments ``('a', 'b', 3, 'c')``."""
+	segments = []
+	for part in p.split(delim):
+		head, *indexes = part.split('[')
+		if head:
+			segments.append(head)
+		elif not indexes:
+			raise ValueError("empty segment in path {}".format(p))
+		for idx in indexes:
+			if not idx.endswith(']'):
+				raise ValueError("malformed list index in path {}".format(p))
+			segments.append(int(idx[:-1]))
+	return tuple(segments)
+
+
+class DictooPath:
+	"""A parsed path into nested Dictoos.
+
+	Lookups descend iteratively through the underlying dicts and lists and
+	do not create temporary Dictoos for missing keys.
+	"""
+	__slots__ = ('segments',)
+
+	def __init__(self, segments: Tuple[Union[str, int], ...]):
+		if len(segments) == 0:
+			raise ValueError('Cannot create an empty path')
+		self.segments = segments
+
+	def get(self, d: Dictoo, default: Any = _MISSING) -> Any:
+		v = _descend(d, self.segments)
+		if v is _MISSING:
+			if default is _MISSING:
+				raise KeyError(self)
+			return default
+		return v
+
+	def has(self, d: Dictoo) -> bool:
+		return _descend(d, self.segments) is not _MISSING
+
+	def set(self, d: Dictoo, v: Any) -> None:
+		"""Sets the value under the path, missing intermediate dicts are created."""
+		node = d
+		for k in self.segments[:-1]:
+			child = _child(node, k)
+			if child is _MISSING:
+				if not isinstance(node, DictooDict):
+					raise IndexError("{} is not a valid index of {}".format(k, self))
+				node[k] = {}
+				child = dict.__getitem__(node, k)
+			node = child
+		node[self.segments[-1]] = v
+
+	def __eq__(self, other) -> bool:
+		return isinstance(other, DictooPath) and self.segments == other.segments
+
+	def __hash__(self) -> int:
+		return hash(self.segments)
+
+	def __repr__(self) -> str:
+		return "DictooPath({})".format(self.segments)
+
+
+@lru_cache(maxsize=4096)
+def _compile(p: str, delim: str) -> DictooPath:
+	return DictooPath(_parse_path(p, delim))
+
+def path(p: Union[str, tuple, DictooPath]) -> DictooPath:
+	"""Compiles a path like ``a.b[3].c`` or a tuple of keys and indexes.
+
+	Compiled paths are cached, so calling this repeatedly with the same string is cheap.
+	"""
+	if isinstance(p, DictooPath):
+		return p
+	if isinstance(p, tuple):
+		return DictooPath(p)
+	return _compile(p, CONFIG["delim"])
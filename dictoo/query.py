@@ -0,0 +1,172 @@
+from functools import lru_cache
+from typing import Any, Callable, Iterator, List, Tuple, Union
+import re
+
+from .dictoo import CONFIG, Dictoo, _MISSING, _child
+
+# steps of a compiled query
+_KEY, _INDEX, _SLICE, _ANY, _REGEX, _DESCEND = range(6)
+
+
+def _parse_brackets(q: str, i: int, steps: List[Tuple]) -> int:
+	while i < len(q) and q[i] == '[':
+		end = q.find(']', i)
+		if end < 0:
+			raise ValueError("unclosed [ in query {}".format(q))
+		inner = q[i + 1:end].strip()
+		if inner == '*':
+			steps.append((_ANY, None))
+		elif ':' in inner:
+			parts = [int(p) if p.strip() else None for p in inner.split(':')]
+			if len(parts) > 3:
+				raise ValueError("malformed slice [{}] in query {}".format(inner, q))
+			steps.append((_SLICE, slice(*parts)))
+		else:
+			steps.append((_INDEX, int(inner)))
+		i = end + 1
+	return i
+
+@lru_cache(maxsize=1024)
+def _parse_query(q: str, delim: str) -> Tuple[Tuple, ...]:
+	"""Parses a query like ``layers[*].weights`` or ``re:/^enc_\\d+$/.bias`` into its steps."""
+	steps = []
+	i = 0
+	while True:
+		if q.startswith('re:/', i):
+			# the pattern may contain the delimiter and brackets, it ends at the next unescaped /
+			end = i + 4
+			while end < len(q) and q[end] != '/':
+				end += 2 if q[end] == '\\' else 1
+			if end >= len(q):
+				raise ValueError("unclosed regex in query {}".format(q))
+			steps.append((_REGEX, re.compile(q[i + 4:end])))
+			i = end + 1
+		else:
+			end = i
+			while end < len(q) and q[end] != '[' and not q.startswith(delim, end):
+				end += 1
+			name = q[i:end]
+			if name == '**':
+				steps.append((_DESCEND, None))
+			elif name == '*':
+				steps.append((_ANY, None))
+			elif name:
+				steps.append((_KEY, name))
+			elif end >= len(q) or q[end] != '[':
+				raise ValueError("empty segment in query {}".format(q))
+			i = end
+		i = _parse_brackets(q, i, steps)
+		if i >= len(q):
+			return tuple(steps)
+		if not q.startswith(delim, i):
+			raise ValueError("expected {!r} at position {} of query {}".format(delim, i, q))
+		i += len(delim)
+
+
+def _children(node: Any) -> Iterator[Tuple[Any, Any]]:
+	if isinstance(node, dict):
+		# the keys are copied because lazy parents store their wrapped children while iterating
+		for k in list(dict.keys(node)):
+			yield k, _child(node, k)
+	elif isinstance(node, list):
+		for i in range(len(node)):
+			yield i, _child(node, i)
+
+def _match(node: Any, steps: Tuple[Tuple, ...], i: int, path: Tuple, parent: Any, key: Any) -> Iterator[Tuple[Tuple, Any, Any, Any]]:
+	"""Yields (path, parent, key, value) of every match, descending through the stored children only."""
+	if i == len(steps):
+		yield path, parent, key, node
+		return
+	kind, arg = steps[i]
+	if kind == _KEY or kind == _INDEX:
+		v = _child(node, arg)
+		if v is not _MISSING:
+			yield from _match(v, steps, i + 1, path + (arg,), node, arg)
+	elif kind == _ANY:
+		for k, v in _children(node):
+			yield from _match(v, steps, i + 1, path + (k,), node, k)
+	elif kind == _REGEX:
+		if isinstance(node, dict):
+			for k in list(dict.keys(node)):
+				if isinstance(k, str) and arg.search(k):
+					yield from _match(_child(node, k), steps, i + 1, path + (k,), node, k)
+	elif kind == _SLICE:
+		if isinstance(node, list):
+			for k in range(*arg.indices(len(node))):
+				yield from _match(_child(node, k), steps, i + 1, path + (k,), node, k)
+	else:
+		# ** matches zero or more levels
+		yield from _match(node, steps, i + 1, path, parent, key)
+		for k, v in _children(node):
+			if isinstance(v, (dict, list)):
+				yield from _match(v, steps, i, path + (k,), node, k)
+
+
+class Query:
+	"""A compiled query that selects many items of a Dictoo.
+
+	Segments are separated by the delimiter and are either a key, ``*`` for
+	all children, ``**`` for any number of levels or ``re:/pattern/`` for the
+	keys that the pattern matches. Each segment can be followed by list
+	selectors ``[3]``, ``[*]`` or a slice ``[10:20]``, e.g.
+
+		query('layers[*].weights').get_all(d)
+		query('**.lr').set_all(d, 0.1)
+		query('re:/^enc_\\d+$/.bias').apply(d, np.zeros_like)
+
+	Matching walks the stored dicts and lists, no intermediate Dictoos are built.
+	"""
+	__slots__ = ('query', 'steps')
+
+	def __init__(self, query: str, steps: Tuple[Tuple, ...]):
+		self.query = query
+		self.steps = steps
+
+	def iter_matches(self, d: Dictoo) -> Iterator[Tuple[Tuple, Any]]:
+		"""Yields (path, value) of every match in depth-first order."""
+		for path, _, _, v in _match(d, self.steps, 0, (), None, None):
+			yield path, v
+
+	def paths(self, d: Dictoo) -> List[Tuple]:
+		return [path for path, _ in self.iter_matches(d)]
+
+	def get_all(self, d: Dictoo) -> List[Any]:
+		return [v for _, v in self.iter_matches(d)]
+
+	def _update(self, d: Dictoo, fn: Callable[[Any], Any]) -> int:
+		# the matches are collected first, writes must not change what is being iterated
+		matches = [(parent, key, v) for _, parent, key, v in _match(d, self.steps, 0, (), None, None)]
+		for parent, key, v in matches:
+			if parent is None:
+				raise ValueError("Cannot replace the root of a Dictoo, query {}".format(self.query))
+			# a 1-tuple sets dict keys that contain the delimiter literally
+			parent[key if isinstance(parent, list) else (key,)] = fn(v)
+		return len(matches)
+
+	def set_all(self, d: Dictoo, v: Any) -> int:
+		"""Sets every match to v and returns the number of matches."""
+		return self._update(d, lambda _: v)
+
+	def apply(self, d: Dictoo, fn: Callable[[Any], Any]) -> int:
+		"""Replaces every match x by fn(x) and returns the number of matches."""
+		return self._update(d, fn)
+
+	def __eq__(self, other) -> bool:
+		return isinstance(other, Query) and self.steps == other.steps
+
+	def __hash__(self) -> int:
+		return hash(self.steps)
+
+	def __repr__(self) -> str:
+		return "Query({!r})".format(self.query)
+
+
+@lru_cache(maxsize=1024)
+def _compile(q: str, delim: str) -> Query:
+	return Query(q, _parse_query(q, delim))
+
+def query(q: Union[str, Query]) -> Query:
+	"""Compiles a query, see `Query`. Compiled queries are cached."""
+	if isinstance(q, Query):
+		return q
+	return _compile(q, CONFIG["delim"])
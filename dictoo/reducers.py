@@ -0,0 +1,135 @@
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
+import itertools
+
+from .dictoo import Dictoo
+from .tree import TreeDef, flatten
+
+
+class Reducer:
+	"""An incremental reduction of the leaves under one path.
+
+	`init` turns the first leaf into a state, `accumulate` folds in the
+	following leaves, `merge` combines the states of two partial reductions
+	and `finalize` turns a state into the result. States must be picklable
+	to reduce with a process pool.
+	"""
+
+	def init(self, leaf: Any) -> Any:
+		return leaf
+
+	def accumulate(self, state: Any, leaf: Any) -> Any:
+		return self.merge(state, self.init(leaf))
+
+	def merge(self, a: Any, b: Any) -> Any:
+		raise NotImplementedError()
+
+	def finalize(self, state: Any) -> Any:
+		return state
+
+
+def _is_array(v) -> bool:
+	return type(v).__module__ == 'numpy'
+
+class Sum(Reducer):
+	def merge(self, a, b):
+		return a + b
+
+class Mean(Reducer):
+	def init(self, leaf):
+		return (leaf, 1)
+
+	def accumulate(self, state, leaf):
+		return (state[0] + leaf, state[1] + 1)
+
+	def merge(self, a, b):
+		return (a[0] + b[0], a[1] + b[1])
+
+	def finalize(self, state):
+		return state[0] / state[1]
+
+class Max(Reducer):
+	def merge(self, a, b):
+		if _is_array(a) or _is_array(b):
+			import numpy as np
+			return np.maximum(a, b)
+		return a if a >= b else b
+
+class Min(Reducer):
+	def merge(self, a, b):
+		if _is_array(a) or _is_array(b):
+			import numpy as np
+			return np.minimum(a, b)
+		return a if a <= b else b
+
+
+def _accumulate(reducer: Reducer, states: Union[List, None], values: Iterable[Dictoo], treedef: TreeDef) -> Union[List, None]:
+	for d in values:
+		leaves = treedef.flatten(d)
+		if states is None:
+			states = [reducer.init(x) for x in leaves]
+		else:
+			states = [reducer.accumulate(s, x) for s, x in zip(states, leaves)]
+	return states
+
+def _merge(reducer: Reducer, a: List, b: List) -> List:
+	return [reducer.merge(x, y) for x, y in zip(a, b)]
+
+def _chunks(values: Iterator[Dictoo], chunksize: int) -> Iterator[List[Dictoo]]:
+	while True:
+		chunk = list(itertools.islice(values, chunksize))
+		if len(chunk) == 0:
+			return
+		yield chunk
+
+def stream_reduce(reducer: Reducer, values: Iterable[Dictoo], is_leaf: Union[Callable[[Any], bool], None] = None, executor: Any = None, chunksize: int = 64) -> Dictoo:
+	"""Reduces an iterable of Dictoos with the same structure, e.g. a generator of per-step metrics.
+
+	Only one reduction state per leaf is kept, so memory does not grow with
+	the number of values. With an executor, chunks of values are reduced
+	concurrently and their states are merged pairwise, like a binary tree.
+
+	Args:
+		reducer (Reducer): e.g. Sum(), Mean(), Max() or Min()
+		values (Iterable[Dictoo]): the Dictoos, consumed once
+		is_leaf (Callable): optionally marks nested Dictoos as leaves, see `flatten`
+		executor (str | Executor): "thread", "process" or an Executor
+		chunksize (int): the number of Dictoos per task of the executor
+	Return:
+		a Dictoo with the structure of the values and the finalized reductions as leaves
+	"""
+	values = iter(values)
+	try:
+		first = next(values)
+	except StopIteration:
+		raise ValueError("Cannot reduce an empty iterable")
+	leaves, treedef = flatten(first, is_leaf)
+	states = [reducer.init(x) for x in leaves]
+
+	if executor is None:
+		states = _accumulate(reducer, states, values, treedef)
+	else:
+		from .op import _num_workers, _open_executor
+		with _open_executor(executor) as pool:
+			workers = _num_workers()
+			pending = []
+			# (level, states) with strictly decreasing levels, like the digits of a binary counter
+			stack = [(0, states)]
+			for chunk in _chunks(values, chunksize):
+				pending.append(pool.submit(_accumulate, reducer, None, chunk, treedef))
+				# bound the number of chunks in memory
+				while len(pending) >= 2 * workers:
+					_push(reducer, stack, pending.pop(0).result())
+			for f in pending:
+				_push(reducer, stack, f.result())
+		states = stack.pop()[1]
+		while stack:
+			states = _merge(reducer, stack.pop()[1], states)
+
+	return treedef.unflatten([reducer.finalize(s) for s in states], typed=False)
+
+def _push(reducer: Reducer, stack: List[Tuple[int, List]], states: List) -> None:
+	level = 0
+	while stack and stack[-1][0] == level:
+		states = _merge(reducer, stack.pop()[1], states)
+		level += 1
+	stack.append((level, states))
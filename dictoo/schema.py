@@ -0,0 +1,148 @@
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Tuple, Union
+
+from .dictoo import _MISSING
+
+# check(value, path, errors) appends (path, message) for every mismatch below value
+_Check = Callable[[Any, Tuple, List[Tuple[Tuple, str]]], None]
+
+
+class _Compiled:
+	__slots__ = ('check', 'children', 'item')
+
+	def __init__(self, check: _Check, children: Union[Dict, None] = None, item: Union['_Compiled', None] = None):
+		self.check = check
+		self.children = children
+		self.item = item
+
+
+def _type_name(types: Union[type, Tuple[type, ...]]) -> str:
+	if isinstance(types, tuple):
+		return " or ".join(t.__name__ for t in types)
+	return types.__name__
+
+def _check_any(v, path, errors):
+	pass
+
+def _compile_leaf(types: Union[type, Tuple[type, ...]]) -> _Compiled:
+	def check(v, path, errors):
+		if not isinstance(v, types):
+			errors.append((path, "expected {}, got {}".format(_type_name(types), type(v).__name__)))
+	return _Compiled(check)
+
+def _compile_dict(spec: Mapping) -> _Compiled:
+	children = {k: _compile(s) for k, s in spec.items()}
+	items = tuple((k, c.check) for k, c in children.items())
+
+	def check(v, path, errors):
+		if not isinstance(v, Mapping):
+			errors.append((path, "expected a mapping, got {}".format(type(v).__name__)))
+			return
+		# dict.get does not wrap the children of lazy Dictoos
+		get = dict.get if isinstance(v, dict) else type(v).get
+		for k, child_check in items:
+			x = get(v, k, _MISSING)
+			if x is _MISSING:
+				errors.append((path + (k,), "missing"))
+			else:
+				child_check(x, path + (k,), errors)
+	return _Compiled(check, children=children)
+
+def _compile_list(spec: List) -> _Compiled:
+	if len(spec) != 1:
+		raise ValueError("A list schema has exactly one item spec, got {}".format(spec))
+	item = _compile(spec[0])
+	item_check = item.check
+	item_types = spec[0] if isinstance(spec[0], (type, tuple)) else None
+
+	def check(v, path, errors):
+		if not isinstance(v, list):
+			errors.append((path, "expected a list, got {}".format(type(v).__name__)))
+			return
+		if item_types is not None:
+			# lists of leaves are checked without building the path of every item
+			for i, x in enumerate(list.__iter__(v)):
+				if not isinstance(x, item_types):
+					errors.append((path + (i,), "expected {}, got {}".format(_type_name(item_types), type(x).__name__)))
+		elif item_check is not _check_any:
+			for i, x in enumerate(list.__iter__(v)):
+				item_check(x, path + (i,), errors)
+	return _Compiled(check, item=item)
+
+def _compile(spec: Any) -> _Compiled:
+	if spec is None or spec is Any:
+		return _Compiled(_check_any)
+	elif isinstance(spec, (type, tuple)):
+		return _compile_leaf(spec)
+	elif isinstance(spec, Mapping):
+		return _compile_dict(spec)
+	elif isinstance(spec, list):
+		return _compile_list(spec)
+	raise ValueError("unsupported schema spec {}".format(spec))
+
+
+class Schema:
+	"""A nested type spec that is compiled into a validator once.
+
+	A spec is a type or a tuple of types for a leaf, None or Any for anything,
+	a dict from keys to specs for a mapping that has at least these keys, and a
+	one item list [spec] for a list whose items all match spec, e.g.
+
+		Schema({'lr': float, 'layers': [int], 'data': {'paths': [str]}})
+
+	Validation is explicit and never runs when items are inserted, so the
+	spec can be checked once after a bulk load, or only for the paths that
+	an update touched.
+
+	A bulk load can skip the type checks of the constructor with
+	`Dictoo(data, __trusted=True)`, keys that contain the delimiter are
+	still nested, e.g. {'a.b': 1} builds {'a': {'b': 1}}.
+	"""
+	__slots__ = ('spec', '_root')
+
+	def __init__(self, spec: Any):
+		self.spec = spec
+		self._root = _compile(spec)
+
+	def errors(self, d: Any, paths: Union[Iterable[Union[str, tuple]], None] = None) -> List[Tuple[Tuple, str]]:
+		"""Returns (path, message) of every mismatch, only the subtrees under paths are checked if given."""
+		errors = []
+		if paths is None:
+			self._root.check(d, (), errors)
+			return errors
+
+		from .paths import path as compile_path
+		for p in paths:
+			segments = compile_path(p).segments
+			node = self._root
+			v = d
+			for i, k in enumerate(segments):
+				if node.children is not None:
+					node = node.children.get(k)
+				else:
+					node = node.item
+				if node is None:
+					# the spec does not constrain this subtree
+					break
+				if isinstance(v, dict):
+					v = dict.get(v, k, _MISSING)
+				elif isinstance(v, list) and isinstance(k, int) and -len(v) <= k < len(v):
+					v = list.__getitem__(v, k)
+				else:
+					v = _MISSING
+				if v is _MISSING:
+					errors.append((segments[:i + 1], "missing"))
+					break
+			else:
+				node.check(v, segments, errors)
+		return errors
+
+	def validate(self, d: Any, paths: Union[Iterable[Union[str, tuple]], None] = None) -> None:
+		"""Raises a TypeError that lists every mismatch, see `errors`."""
+		errors = self.errors(d, paths)
+		if len(errors) > 0:
+			raise TypeError("The Dictoo does not match the schema:\n" + "\n".join(
+				"  {}: {}".format(".".join(str(k) for k in path) or "<root>", msg) for path, msg in errors
+			))
+
+	def __repr__(self) -> str:
+		return "Schema({!r})".format(self.spec)
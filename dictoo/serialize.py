@@ -0,0 +1,162 @@
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, Union
+import json
+
+# encoders of leaf types that json and yaml cannot write, looked up along the mro
+_ENCODERS: Dict[type, Callable[[Any], Any]] = {}
+
+_YAML_BASIC = (str, int, float, bool, type(None))
+
+
+def register_encoder(cls: type, encoder: Callable[[Any], Any]) -> None:
+	"""Registers how `to_json`, `to_yaml` and `dump` write leaves of type cls.
+
+	The encoder returns a json serializable replacement, e.g. `lambda a: a.tolist()`.
+	Numpy arrays and scalars are written with `tolist` unless another encoder is registered.
+	"""
+	_ENCODERS[cls] = encoder
+
+def _encode_leaf(v: Any) -> Any:
+	for cls in type(v).__mro__:
+		encoder = _ENCODERS.get(cls)
+		if encoder is not None:
+			return encoder(v)
+	# numpy is not imported for this check
+	if type(v).__module__ == 'numpy' and hasattr(v, 'tolist'):
+		return v.tolist()
+	raise TypeError("Object of type {} is not serializable".format(type(v).__name__))
+
+def _is_flat(node: Union[dict, list]) -> bool:
+	for v in (dict.values(node) if isinstance(node, dict) else list.__iter__(node)):
+		if isinstance(v, (dict, list)):
+			return False
+	return True
+
+### JSON
+def _json_key(k: Any, encoder: json.JSONEncoder) -> str:
+	if isinstance(k, str):
+		return encoder.encode(k)
+	elif k is True or k is False or k is None:
+		return '"{}"'.format(json.dumps(k))
+	elif isinstance(k, (int, float)):
+		return '"{}"'.format(encoder.encode(k))
+	raise TypeError("keys must be str, int, float, bool or None, not {}".format(type(k).__name__))
+
+def _iter_json(node: Any, encoder: json.JSONEncoder, level: int) -> Iterator[str]:
+	"""Yields the json of node piece by piece.
+
+	Subtrees without nested dicts or lists are encoded in one call of the C encoder,
+	so memory is bounded by the largest such subtree instead of the whole tree.
+	"""
+	indent = encoder.indent
+	if not isinstance(node, (dict, list)) or len(node) == 0 or _is_flat(node):
+		s = encoder.encode(node)
+		yield s if indent is None or level == 0 else s.replace('\n', '\n' + indent * level)
+		return
+
+	if indent is None:
+		open_sep = item_sep = close_sep = ''
+	else:
+		open_sep = '\n' + indent * (level + 1)
+		item_sep = open_sep
+		close_sep = '\n' + indent * level
+	item_sep = encoder.item_separator + item_sep
+
+	if isinstance(node, dict):
+		items = dict.items(node)
+		if encoder.sort_keys:
+			items = sorted(items)
+		yield '{' + open_sep
+		for i, (k, v) in enumerate(items):
+			yield (item_sep if i else '') + _json_key(k, encoder) + encoder.key_separator
+			yield from _iter_json(v, encoder, level + 1)
+		yield close_sep + '}'
+	else:
+		yield '[' + open_sep
+		for i, v in enumerate(list.__iter__(node)):
+			if i:
+				yield item_sep
+			yield from _iter_json(v, encoder, level + 1)
+		yield close_sep + ']'
+
+def to_json(node: Any, fp: Union[IO[str], None] = None, indent: Union[int, str, None] = None, default: Union[Callable[[Any], Any], None] = None, **kwargs) -> Union[str, None]:
+	if isinstance(indent, int):
+		indent = ' ' * indent
+	encoder = json.JSONEncoder(indent=indent, default=default or _encode_leaf, **kwargs)
+	chunks = _iter_json(node, encoder, 0)
+	if fp is None:
+		return ''.join(chunks)
+	for chunk in chunks:
+		fp.write(chunk)
+
+### YAML
+# yaml is imported on first use so that `import dictoo` stays cheap
+def _node_events(node: 'yaml.Node', resolver: 'yaml.resolver.BaseResolver') -> Iterator['yaml.Event']:
+	# what yaml.serializer.Serializer does, without requiring the whole document as one node
+	import yaml
+	if isinstance(node, yaml.ScalarNode):
+		detected = resolver.resolve(yaml.ScalarNode, node.value, (True, False))
+		default = resolver.resolve(yaml.ScalarNode, node.value, (False, True))
+		yield yaml.ScalarEvent(None, node.tag, (node.tag == detected, node.tag == default), node.value, style=node.style)
+	elif isinstance(node, yaml.SequenceNode):
+		implicit = node.tag == resolver.resolve(yaml.SequenceNode, node.value, True)
+		yield yaml.SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+		for item in node.value:
+			yield from _node_events(item, resolver)
+		yield yaml.SequenceEndEvent()
+	else:
+		implicit = node.tag == resolver.resolve(yaml.MappingNode, node.value, True)
+		yield yaml.MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+		for k, v in node.value:
+			yield from _node_events(k, resolver)
+			yield from _node_events(v, resolver)
+		yield yaml.MappingEndEvent()
+
+def _yaml_leaf_events(v: Any, representer: 'yaml.representer.BaseRepresenter', resolver: 'yaml.resolver.BaseResolver', default: Callable[[Any], Any]) -> Iterator['yaml.Event']:
+	if not isinstance(v, _YAML_BASIC) and type(v).__module__ != 'builtins':
+		v = default(v)
+	node = representer.represent_data(v)
+	# leaves are represented one by one, the state used for anchors is reset
+	representer.represented_objects = {}
+	representer.object_keeper = []
+	yield from _node_events(node, resolver)
+
+def _iter_yaml(node: Any, representer: 'yaml.representer.BaseRepresenter', resolver: 'yaml.resolver.BaseResolver', default: Callable[[Any], Any]) -> Iterator['yaml.Event']:
+	import yaml
+	if isinstance(node, dict):
+		yield yaml.MappingStartEvent(None, None, True, flow_style=False)
+		for k, v in dict.items(node):
+			yield from _yaml_leaf_events(k, representer, resolver, default)
+			yield from _iter_yaml(v, representer, resolver, default)
+		yield yaml.MappingEndEvent()
+	elif isinstance(node, list):
+		yield yaml.SequenceStartEvent(None, None, True, flow_style=False)
+		for v in list.__iter__(node):
+			yield from _iter_yaml(v, representer, resolver, default)
+		yield yaml.SequenceEndEvent()
+	else:
+		yield from _yaml_leaf_events(node, representer, resolver, default)
+
+def _yaml_events(node: Any, default: Callable[[Any], Any]) -> Iterator['yaml.Event']:
+	import yaml
+	representer = yaml.representer.Representer(default_flow_style=False)
+	resolver = yaml.resolver.Resolver()
+	yield yaml.StreamStartEvent()
+	yield yaml.DocumentStartEvent(explicit=False)
+	yield from _iter_yaml(node, representer, resolver, default)
+	yield yaml.DocumentEndEvent(explicit=False)
+	yield yaml.StreamEndEvent()
+
+def to_yaml(node: Any, fp: Union[IO[str], None] = None, default: Union[Callable[[Any], Any], None] = None, **kwargs) -> Union[str, None]:
+	import yaml
+	dumper = getattr(yaml, 'CDumper', yaml.Dumper)
+	return yaml.emit(_yaml_events(node, default or _encode_leaf), fp, Dumper=dumper, **kwargs)
+
+def dump(node: Any, path: Union[str, Path], **kwargs) -> None:
+	from .dictoo import _format
+	path = Path(path)
+	_, write = _format(path)
+	if write is None:
+		raise ValueError("The format of {} cannot be written".format(path.name))
+	with open(path, "w") as f:
+		write(node, f, **kwargs)
@@ -0,0 +1,110 @@
+from typing import Any, List, Tuple
+import sys
+
+from .dictoo import Dictoo
+from .tree import TreeDef, flatten
+
+# offsets of the arrays in the block are aligned for every dtype
+_ALIGNMENT = 64
+
+
+class _SharedArray:
+	"""Placeholder for an array leaf that is stored in the shared memory block."""
+	__slots__ = ('offset', 'shape', 'dtype')
+
+	def __init__(self, offset: int, shape: Tuple[int, ...], dtype: str):
+		self.offset = offset
+		self.shape = shape
+		self.dtype = dtype
+
+	def __reduce__(self):
+		return (_SharedArray, (self.offset, self.shape, self.dtype))
+
+
+class SharedDictoo:
+	"""A picklable handle to a Dictoo whose array leaves live in shared memory.
+
+	The handle only holds the structure, the offsets of the arrays and the
+	other leaves, so sending it to a worker process is cheap. Every process
+	that calls `from_shared` must `close` the handle once it no longer uses
+	the returned Dictoo, and exactly one process must `unlink` the block.
+	"""
+	__slots__ = ('name', 'size', 'treedef', 'leaves', '_shm')
+
+	def __init__(self, name: str, size: int, treedef: TreeDef, leaves: List[Any], shm=None):
+		self.name = name
+		self.size = size
+		self.treedef = treedef
+		self.leaves = leaves
+		self._shm = shm
+
+	def __reduce__(self):
+		# the mapping is process local, the receiving process attaches by name
+		return (SharedDictoo, (self.name, self.size, self.treedef, self.leaves))
+
+	def _attach(self):
+		if self._shm is None:
+			from multiprocessing import shared_memory
+			kwargs = {'track': False} if sys.version_info >= (3, 13) else {}
+			self._shm = shared_memory.SharedMemory(name=self.name, **kwargs)
+		return self._shm
+
+	def close(self) -> None:
+		"""Unmaps the block in this process, the Dictoos returned by `from_shared` must not be used afterwards."""
+		if self._shm is not None:
+			self._shm.close()
+			self._shm = None
+
+	def unlink(self) -> None:
+		"""Frees the block once all processes have closed it."""
+		self._attach().unlink()
+
+	def __enter__(self) -> 'SharedDictoo':
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def __repr__(self) -> str:
+		return "SharedDictoo({!r}, size={})".format(self.name, self.size)
+
+
+def _is_shareable(v) -> bool:
+	# object arrays hold pointers into the creating process and are pickled instead
+	return type(v).__module__ == 'numpy' and hasattr(v, 'dtype') and getattr(v, 'ndim', 0) > 0 and not v.dtype.hasobject
+
+def to_shared(d: Dictoo) -> SharedDictoo:
+	"""Copies the numpy array leaves of a Dictoo into one shared memory block.
+
+	Args:
+		d (Dictoo): the Dictoo to share
+	Return:
+		a handle that `from_shared` turns back into a Dictoo in any process
+	"""
+	from multiprocessing import shared_memory
+	import numpy as np
+
+	leaves, treedef = flatten(d)
+	size = 0
+	placed = []
+	for i, v in enumerate(leaves):
+		if _is_shareable(v):
+			placed.append((i, size, v))
+			size += -(-v.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+	shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+	for i, offset, v in placed:
+		np.copyto(np.ndarray(v.shape, v.dtype, buffer=shm.buf, offset=offset), v, casting='no')
+		leaves[i] = _SharedArray(offset, v.shape, v.dtype.str)
+	return SharedDictoo(shm.name, size, treedef, leaves, shm)
+
+def from_shared(handle: SharedDictoo) -> Dictoo:
+	"""Rebuilds a Dictoo whose array leaves are zero-copy views into the shared block."""
+	import numpy as np
+
+	buf = handle._attach().buf
+	leaves = [
+		np.ndarray(v.shape, np.dtype(v.dtype), buffer=buf, offset=v.offset) if type(v) is _SharedArray else v
+		for v in handle.leaves
+	]
+	return handle.treedef.unflatten(leaves)
@@ -0,0 +1,149 @@
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+import functools
+import sys
+import threading
+import time
+
+from . import dictoo as _dictoo
+from . import op as _op
+from .dictoo import Dictoo, DictooDict, DictooList
+
+# counting is switched on by replacing the functions below with wrappers, so that a
+# disabled instrumentation costs nothing on the hot paths
+_COUNTED = [
+	(_dictoo, '_new_node', 'node_allocations'),
+	(DictooDict, '__init__', 'wraps'),
+	(DictooList, '__init__', 'wraps'),
+	(Dictoo, '_wrap_lazy', 'lazy_wraps'),
+	(Dictoo, '_check_value', 'value_checks'),
+	(Dictoo, '_recurse_key', 'key_recursions'),
+	(DictooDict, '__missing__', 'autovivifications'),
+	(DictooDict, 'to_dict', 'copies'),
+	(DictooList, 'to_list', 'copies'),
+]
+_TIMED = [
+	(_op, 'apply', 'apply'),
+	(_op, 'reduce', 'reduce'),
+	(Dictoo, 'from_file', 'from_file'),
+]
+
+_COUNTS = Counter()
+_TIMERS: Dict[str, List] = {}
+_local = threading.local()
+# (owner, name, original) of every replaced attribute
+_PATCHED: List[Tuple[Any, str, Any]] = []
+# cache_info of the key parsers when the stats were last reset
+_PARSES_AT_RESET = (0, 0)
+
+
+def _counting(name: str, fn: Callable) -> Callable:
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		_COUNTS[name] += 1
+		return fn(*args, **kwargs)
+	return wrapper
+
+def _counting_descend(fn: Callable) -> Callable:
+	@functools.wraps(fn)
+	def wrapper(node, segments):
+		depth = len(segments)
+		_COUNTS['traversals'] += 1
+		_COUNTS['traversal_depth'] += depth
+		if depth > _COUNTS['max_traversal_depth']:
+			_COUNTS['max_traversal_depth'] = depth
+		return fn(node, segments)
+	return wrapper
+
+def _timing(name: str, fn: Callable) -> Callable:
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		active = _local.__dict__.setdefault('active', set())
+		if name in active:
+			# recursive calls are part of the outermost call
+			return fn(*args, **kwargs)
+		active.add(name)
+		start = time.perf_counter()
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			active.discard(name)
+			timer = _TIMERS.setdefault(name, [0, 0.0])
+			timer[0] += 1
+			timer[1] += time.perf_counter() - start
+	return wrapper
+
+def _patch(owner: Any, name: str, make_wrapper: Callable[[Callable], Callable]) -> None:
+	original = owner.__dict__[name]
+	is_static = isinstance(original, staticmethod)
+	wrapper = make_wrapper(original.__func__ if is_static else original)
+	wrapper = staticmethod(wrapper) if is_static else wrapper
+	targets = [owner]
+	if isinstance(owner, type(sys)):
+		# functions imported by name into other modules of the package, e.g. `from .op import *`
+		targets += [
+			m for k, m in list(sys.modules.items())
+			if (k == 'dictoo' or k.startswith('dictoo.')) and m is not owner and getattr(m, name, None) is original
+		]
+	for target in targets:
+		setattr(target, name, wrapper)
+		_PATCHED.append((target, name, original))
+
+def _parses() -> Tuple[int, int]:
+	from .paths import _parse_path
+	lookups = parses = 0
+	for fn in (_dictoo._split_key, _parse_path):
+		info = fn.cache_info()
+		lookups += info.hits + info.misses
+		parses += info.misses
+	return lookups, parses
+
+def enable_stats() -> None:
+	"""Starts counting the hot-path operations of all Dictoos, see `stats`."""
+	if is_enabled():
+		return
+	for owner, name, counter in _COUNTED:
+		_patch(owner, name, functools.partial(_counting, counter))
+	_patch(_dictoo, '_descend', _counting_descend)
+	for owner, name, timer in _TIMED:
+		_patch(owner, name, functools.partial(_timing, timer))
+
+def disable_stats() -> None:
+	"""Restores the uninstrumented functions, the collected stats are kept."""
+	while _PATCHED:
+		target, name, original = _PATCHED.pop()
+		setattr(target, name, original)
+
+def is_enabled() -> bool:
+	return len(_PATCHED) > 0
+
+def reset_stats() -> None:
+	global _PARSES_AT_RESET
+	_COUNTS.clear()
+	_TIMERS.clear()
+	_PARSES_AT_RESET = _parses()
+
+def stats(reset: bool = False) -> Dict[str, Any]:
+	"""Returns the counters and timers collected since the last reset.
+
+	Counters: node_allocations, wraps (Dictoos built from data), lazy_wraps,
+	value_checks, key_recursions, autovivifications, copies (nodes copied by
+	to_dict/to_list), traversals, traversal_depth and max_traversal_depth of
+	path lookups. key_lookups and key_parses (cache misses) of the path parsers
+	are always counted, keys without the delimiter are not parsed. Timers: calls and seconds of apply, reduce and from_file.
+
+	Args:
+		reset: reset the stats after reading them, e.g. at the end of a request
+	"""
+	lookups, parses = _parses()
+	counters = dict(_COUNTS)
+	counters['key_lookups'] = lookups - _PARSES_AT_RESET[0]
+	counters['key_parses'] = parses - _PARSES_AT_RESET[1]
+	res = {
+		'enabled': is_enabled(),
+		'counters': counters,
+		'timers': {name: {'calls': t[0], 'seconds': t[1]} for name, t in _TIMERS.items()},
+	}
+	if reset:
+		reset_stats()
+	return res
@@ -0,0 +1,401 @@
+import itertools
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, TextIO, Tuple, Union
+
+from .dictoo import CONFIG, Dictoo, _MISSING, _yaml_loader
+
+
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_REST = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+_SCALAR_END = re.compile(r'[\s,\]}]')
+_WHITESPACE = re.compile(r'\s*')
+# deletes the characters that can occur between the brackets of a container, outside of strings
+_KEEP_BRACKETS = {i: None for i in range(128) if chr(i) not in '[]{}'}
+_BRACKET_DEPTH = {'[': 1, '{': 1, ']': -1, '}': -1}
+# the first block of a skipped container, blocks double up to the max
+_MIN_BLOCK = 256
+_MAX_BLOCK = 1 << 20
+
+
+class _JsonScanner:
+	"""Incrementally scans JSON text from a file.
+
+	Only the values passed to `read_value` are decoded, everything that is
+	skipped is scanned without building python objects. Consumed text is
+	dropped from the buffer, so memory is bounded by the largest value read.
+	"""
+
+	def __init__(self, f: TextIO, chunk_size: Union[int, None] = None):
+		self.f = f
+		self.chunk_size = chunk_size or CONFIG["stream_chunk_size"]
+		self.buf = ""
+		self.pos = 0
+		self.eof = False
+		self.decoder = json.JSONDecoder()
+
+	def _fill(self) -> bool:
+		if self.eof:
+			return False
+		# read at least as much as is buffered, so decoding large values stays linear
+		chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+		self.buf = self.buf[self.pos:] + chunk
+		self.pos = 0
+		if not chunk:
+			self.eof = True
+		return bool(chunk)
+
+	def peek(self) -> str:
+		"""Skips whitespace and returns the next character, '' at the end of the file."""
+		while True:
+			self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+			if self.pos < len(self.buf):
+				return self.buf[self.pos]
+			if not self._fill():
+				return ""
+
+	def expect(self, chars: str) -> str:
+		c = self.peek()
+		if c == "" or c not in chars:
+			raise ValueError("Expected one of {!r} at {!r}".format(chars, self.buf[self.pos:self.pos + 20]))
+		self.pos += 1
+		return c
+
+	def read_value(self) -> Any:
+		self.peek()
+		while True:
+			try:
+				v, end = self.decoder.raw_decode(self.buf, self.pos)
+				# a number cut by the end of the buffer, e.g. "1." or "1e-", decodes as a shorter number
+				is_number = isinstance(v, (int, float)) and not isinstance(v, bool)
+				if self.eof or (end < len(self.buf) and (not is_number or _SCALAR_END.match(self.buf, end))):
+					self.pos = end
+					return v
+			except json.JSONDecodeError:
+				if self.eof:
+					raise
+			self._fill()
+
+	def _search(self, pattern: re.Pattern) -> re.Match:
+		while True:
+			m = pattern.search(self.buf, self.pos)
+			if m is not None:
+				return m
+			if self.eof:
+				raise ValueError("Unexpected end of JSON input")
+			self.pos = len(self.buf)
+			self._fill()
+
+	def _skip_string(self):
+		while True:
+			m = _STRING_REST.match(self.buf, self.pos)
+			if m is not None:
+				self.pos = m.end()
+				return
+			if not self._fill():
+				raise ValueError("Unterminated string in JSON input")
+
+	def skip_value(self):
+		c = self.peek()
+		if c == '"':
+			self.pos += 1
+			self._skip_string()
+		elif c in ('[', '{'):
+			self._skip_tokens(self._skip_blocks())
+		elif c == "":
+			raise ValueError("Unexpected end of JSON input")
+		else:
+			while True:
+				m = _SCALAR_END.search(self.buf, self.pos)
+				if m is not None:
+					self.pos = m.start()
+					return
+				if self.eof:
+					self.pos = len(self.buf)
+					return
+				self._fill()
+
+	def _skip_blocks(self) -> int:
+		"""Skips the blocks of a container that it does not end in and returns the depth reached.
+
+		The strings of a block are split off and everything but the brackets is
+		deleted by string methods, so large containers are skipped without a
+		python step per token.
+		"""
+		depth = 0
+		size = _MIN_BLOCK
+		shrinking = False
+		while True:
+			while len(self.buf) - self.pos < size and self._fill():
+				pass
+			block = self.buf[self.pos:self.pos + size]
+			if '\\' in block:
+				# escapes are replaced by the same number of characters, so the offsets stay valid
+				block = block.replace('\\\\', '__').replace('\\"', '__')
+			# the parts at odd indexes are the contents of strings
+			parts = block.split('"')
+			if len(parts) % 2 == 0:
+				# the block ends inside a string, it is consumed up to the string
+				consumed = len(block) - len(parts.pop()) - 1
+			else:
+				consumed = len(block)
+			brackets = ''.join(parts[::2]).translate(_KEEP_BRACKETS)
+			depths = list(itertools.accumulate(map(_BRACKET_DEPTH.__getitem__, brackets), initial=depth))
+			if min(depths[1:], default=1) <= 0 or (self.eof and consumed == len(self.buf) - self.pos):
+				if size <= _MIN_BLOCK:
+					# the container ends in this block, it is scanned token by token
+					return depth
+				# the block is halved until the end of the container is in a small block
+				size //= 2
+				shrinking = True
+				continue
+			depth = depths[-1]
+			self.pos += consumed
+			if consumed == 0:
+				# a string that is longer than the block
+				self.pos += 1
+				self._skip_string()
+			elif not shrinking:
+				size = min(size * 2, _MAX_BLOCK)
+
+	def _skip_tokens(self, depth: int):
+		while True:
+			m = self._search(_STRUCTURE)
+			self.pos = m.end()
+			ch = m.group()
+			if ch == '"':
+				self._skip_string()
+			elif ch in '[{':
+				depth += 1
+			else:
+				depth -= 1
+				if depth == 0:
+					return
+
+	def enter(self, k: Union[str, int]) -> bool:
+		"""Moves to the value under k in the object or array that starts next, False if there is none."""
+		if isinstance(k, int):
+			self.expect('[')
+			if self.peek() == ']':
+				return False
+			for _ in range(k):
+				self.skip_value()
+				if self.expect(',]') == ']':
+					return False
+			return True
+
+		self.expect('{')
+		if self.peek() == '}':
+			return False
+		while True:
+			key = self.read_value()
+			self.expect(':')
+			if key == k:
+				return True
+			self.skip_value()
+			if self.expect(',}') == '}':
+				return False
+
+	def iter_items(self) -> Iterator[Any]:
+		"""Yields the decoded items of the array that starts next."""
+		self.expect('[')
+		if self.peek() == ']':
+			self.pos += 1
+			return
+		while True:
+			yield self.read_value()
+			if self.expect(',]') == ']':
+				return
+
+
+def _parse_items_path(items: Union[str, None]) -> Tuple[Union[str, int], ...]:
+	from .paths import _parse_path
+
+	if items is None:
+		return ()
+	if not items.endswith('[*]'):
+		raise ValueError("items must point to an array, e.g. 'records[*]', got {}".format(items))
+	prefix = items[:-len('[*]')]
+	return _parse_path(prefix, CONFIG["delim"]) if prefix else ()
+
+def _wrap(record: Any, lazy: bool) -> Any:
+	if isinstance(record, (dict, list)):
+		return Dictoo(record, __lazy=lazy)
+	return record
+
+def _batched(records: Iterator[Any], batch_size: Union[int, None]) -> Iterator[Any]:
+	if batch_size is None:
+		yield from records
+		return
+	batch = []
+	for r in records:
+		batch.append(r)
+		if len(batch) == batch_size:
+			yield _to_dictoo_list(batch)
+			batch = []
+	if batch:
+		yield _to_dictoo_list(batch)
+
+def _to_dictoo_list(records: List[Any]) -> Dictoo:
+	# the records are already wrapped
+	res = Dictoo([])
+	list.extend(res, records)
+	return res
+
+def iter_json(path: Union[str, Path], items: Union[str, None] = None, batch_size: Union[int, None] = None, lazy: bool = False) -> Iterator[Any]:
+	with open(path, "r") as f:
+		scanner = _JsonScanner(f)
+		for k in _parse_items_path(items):
+			if not scanner.enter(k):
+				raise KeyError("{} does not exist in {}".format(items, path))
+		yield from _batched((_wrap(r, lazy) for r in scanner.iter_items()), batch_size)
+
+def iter_jsonl(path: Union[str, Path], batch_size: Union[int, None] = None, lazy: bool = False) -> Iterator[Any]:
+	with open(path, "r") as f:
+		records = (_wrap(json.loads(line), lazy) for line in f if line.strip())
+		yield from _batched(records, batch_size)
+
+
+def _selection_trie(select: Sequence[str]) -> Dict:
+	"""Merges paths into a trie of segments, True marks a selected subtree."""
+	from .paths import _parse_path
+
+	trie = {}
+	for p in select:
+		segments = _parse_path(p, CONFIG["delim"])
+		node = trie
+		for k in segments[:-1]:
+			child = node.setdefault(k, {})
+			if child is True:
+				break
+			node = child
+		else:
+			node[segments[-1]] = True
+	return trie
+
+def _add_selected(res: Union[dict, list], k: Union[str, int], v: Any):
+	if isinstance(res, list):
+		# unselected list items are kept as None so that the indexes stay valid
+		res.extend([None] * (k - len(res)))
+		res.append(v)
+	else:
+		res[k] = v
+
+def _count_selected(trie: Union[Dict, bool]) -> int:
+	return 1 if trie is True else sum(_count_selected(sub) for sub in trie.values())
+
+def _read_json_selected(scanner: _JsonScanner, trie: Union[Dict, bool], remaining: List[int]) -> Any:
+	# remaining counts the selected subtrees that were not read yet, the rest of the input is not scanned once it is 0
+	if trie is True:
+		remaining[0] -= 1
+		return scanner.read_value()
+
+	c = scanner.peek()
+	if c not in ('{', '['):
+		scanner.skip_value()
+		return _MISSING
+	res = {} if c == '{' else []
+	end = '}' if c == '{' else ']'
+	scanner.expect(c)
+	if scanner.peek() == end:
+		scanner.expect(end)
+		return _MISSING
+	idx = 0
+	while True:
+		if c == '{':
+			k = scanner.read_value()
+			scanner.expect(':')
+		else:
+			k = idx
+			idx += 1
+		sub = trie.get(k)
+		if sub is None:
+			scanner.skip_value()
+		else:
+			v = _read_json_selected(scanner, sub, remaining)
+			if v is not _MISSING:
+				_add_selected(res, k, v)
+			if remaining[0] == 0:
+				return res if len(res) > 0 else _MISSING
+		if scanner.expect(',' + end) == end:
+			return res if len(res) > 0 else _MISSING
+
+def load_json_selected(f: TextIO, select: Sequence[str]) -> Union[dict, list]:
+	"""Parses only the subtrees under the selected paths, missing paths are left out.
+
+	Reading stops once every selected path was found, so for duplicate keys the first value is used.
+	"""
+	trie = _selection_trie(select)
+	res = _read_json_selected(_JsonScanner(f), trie, [_count_selected(trie)])
+	return {} if res is _MISSING else res
+
+def _skip_yaml_node(events: Iterator['yaml.Event'], first: 'yaml.Event'):
+	import yaml
+	depth = 1 if isinstance(first, yaml.CollectionStartEvent) else 0
+	while depth > 0:
+		ev = next(events)
+		if isinstance(ev, yaml.CollectionStartEvent):
+			depth += 1
+		elif isinstance(ev, yaml.CollectionEndEvent):
+			depth -= 1
+
+def _load_yaml_node(events: Iterator['yaml.Event'], first: 'yaml.Event') -> Any:
+	import yaml
+	node_events = [first]
+	depth = 1 if isinstance(first, yaml.CollectionStartEvent) else 0
+	while depth > 0:
+		ev = next(events)
+		node_events.append(ev)
+		if isinstance(ev, yaml.CollectionStartEvent):
+			depth += 1
+		elif isinstance(ev, yaml.CollectionEndEvent):
+			depth -= 1
+	document = [yaml.StreamStartEvent(), yaml.DocumentStartEvent()] + node_events + [yaml.DocumentEndEvent(), yaml.StreamEndEvent()]
+	return yaml.load(yaml.emit(document), Loader=_yaml_loader())
+
+def _read_yaml_selected(events: Iterator['yaml.Event'], first: 'yaml.Event', trie: Union[Dict, bool]) -> Any:
+	import yaml
+	if trie is True:
+		return _load_yaml_node(events, first)
+	if not isinstance(first, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+		_skip_yaml_node(events, first)
+		return _MISSING
+
+	res = {} if isinstance(first, yaml.MappingStartEvent) else []
+	idx = 0
+	while True:
+		ev = next(events)
+		if isinstance(ev, yaml.CollectionEndEvent):
+			return res if len(res) > 0 else _MISSING
+		if isinstance(res, dict):
+			if isinstance(ev, yaml.ScalarEvent):
+				k = ev.value
+			else:
+				# complex keys can not be selected
+				_skip_yaml_node(events, ev)
+				k = None
+			ev = next(events)
+		else:
+			k = idx
+			idx += 1
+		sub = trie.get(k) if k is not None else None
+		if sub is None:
+			_skip_yaml_node(events, ev)
+		else:
+			v = _read_yaml_selected(events, ev, sub)
+			if v is not _MISSING:
+				_add_selected(res, k, v)
+
+def load_yaml_selected(f: TextIO, select: Sequence[str]) -> Union[dict, list]:
+	"""Like `load_json_selected`, unselected parts are only tokenized and never constructed.
+
+	Aliases to anchors outside of a selected subtree are not supported.
+	"""
+	import yaml
+	events = yaml.parse(f, Loader=_yaml_loader())
+	for ev in events:
+		if isinstance(ev, yaml.NodeEvent):
+			res = _read_yaml_selected(events, ev, _selection_trie(select))
+			return {} if res is _MISSING else res
+	return {}
@@ -0,0 +1,134 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+
+from .dictoo import Dictoo, DictooDict, DictooList, _MISSING, _new_node, _tree_for
+
+
+class TreeDef:
+	"""The structure of a Dictoo without its leaves.
+
+	A TreeDef is captured once with `flatten` and can then be reused to
+	extract the leaves of, or rebuild, any Dictoo with the same structure
+	without inspecting every node again.
+	"""
+	__slots__ = ('cls', 'keys', 'children', 'type', 'num_leaves', '_hash')
+
+	def __init__(self, cls: type, keys: Union[Tuple, None], children: Tuple[Union['TreeDef', None], ...], type: Union[type, None] = None):
+		self.cls = cls
+		self.keys = keys  # None for lists
+		self.children = children  # None marks a leaf
+		self.type = type
+		self.num_leaves = sum(1 if c is None else c.num_leaves for c in children)
+		self._hash = None
+
+	def flatten(self, d: Dictoo) -> List[Any]:
+		"""Returns the leaves of a Dictoo with this structure in depth-first order."""
+		leaves = []
+		self._flatten_into(d, leaves)
+		return leaves
+
+	def _flatten_into(self, node, leaves: List[Any]):
+		if len(node) != len(self.children):
+			raise ValueError("The Dictoo does not match the structure of the TreeDef")
+		if self.keys is None:
+			values = list.__iter__(node)
+		else:
+			values = (dict.get(node, k, _MISSING) for k in self.keys)
+		for v, c in zip(values, self.children):
+			if v is _MISSING:
+				raise ValueError("The Dictoo does not match the structure of the TreeDef")
+			if c is None:
+				leaves.append(v)
+			else:
+				c._flatten_into(v, leaves)
+
+	def unflatten(self, leaves: List[Any], typed: bool = True) -> Dictoo:
+		"""Builds a Dictoo with this structure, the leaves are inserted as they are.
+
+		The leaves are not checked against the type of the flattened Dictoo, with
+		typed=False the result is untyped, e.g. for leaves computed by an op.
+		"""
+		if len(leaves) != self.num_leaves:
+			raise ValueError("Expected {} leaves but got {}".format(self.num_leaves, len(leaves)))
+		return self._build(iter(leaves), {}, typed)
+
+	def _build(self, leaves: Iterator[Any], trees: Dict, typed: bool) -> Dictoo:
+		# nodes of the same type share one tree state
+		dictoo_type = self.type if typed else None
+		if dictoo_type not in trees:
+			trees[dictoo_type] = _tree_for(dictoo_type)
+		node = _new_node(self.cls, trees[dictoo_type])
+		values = [next(leaves) if c is None else c._build(leaves, trees, typed) for c in self.children]
+		if self.keys is None:
+			list.extend(node, values)
+		else:
+			dict.update(node, zip(self.keys, values))
+		return node
+
+	def paths(self, index: Callable[[int], Any] = int) -> List[Tuple]:
+		"""Returns the key path of every leaf, `index` is applied to list indexes."""
+		res = []
+		self._paths_into((), index, res)
+		return res
+
+	def _paths_into(self, prefix: Tuple, index: Callable[[int], Any], res: List[Tuple]):
+		keys = self.keys if self.keys is not None else [index(i) for i in range(len(self.children))]
+		for k, c in zip(keys, self.children):
+			if c is None:
+				res.append(prefix + (k,))
+			else:
+				c._paths_into(prefix + (k,), index, res)
+
+	def __eq__(self, other) -> bool:
+		return self is other or (
+			isinstance(other, TreeDef)
+			and self.cls is other.cls
+			and self.keys == other.keys
+			and self.type == other.type
+			and self.children == other.children
+		)
+
+	def __hash__(self) -> int:
+		if self._hash is None:
+			self._hash = hash((self.cls, self.keys, self.children))
+		return self._hash
+
+	def __repr__(self) -> str:
+		return "TreeDef({}, num_leaves={})".format(self.cls.__name__, self.num_leaves)
+
+
+def _is_node(v, is_leaf: Union[Callable[[Any], bool], None]) -> bool:
+	return isinstance(v, (DictooDict, DictooList)) and not (is_leaf and is_leaf(v))
+
+def _discover(node: Dictoo, leaves: List[Any], is_leaf: Union[Callable[[Any], bool], None]) -> TreeDef:
+	if isinstance(node, DictooDict):
+		keys = tuple(node.keys())
+		values = node.values()
+	else:
+		keys = None
+		values = node
+	children = []
+	for v in values:
+		if _is_node(v, is_leaf):
+			children.append(_discover(v, leaves, is_leaf))
+		else:
+			leaves.append(v)
+			children.append(None)
+	return TreeDef(type(node), keys, tuple(children), node.get_type())
+
+def flatten(d: Dictoo, is_leaf: Union[Callable[[Any], bool], None] = None) -> Tuple[List[Any], TreeDef]:
+	"""Splits a Dictoo into its leaves and a reusable TreeDef.
+
+	Args:
+		d (Dictoo): the Dictoo to flatten
+		is_leaf (Callable): optionally marks nested Dictoos as leaves
+	Return:
+		the leaves in depth-first order and the structure of d
+	"""
+	if not _is_node(d, is_leaf):
+		raise ValueError("Can only flatten a DictooDict or DictooList")
+	leaves = []
+	treedef = _discover(d, leaves, is_leaf)
+	return leaves, treedef
+
+def unflatten(treedef: TreeDef, leaves: List[Any], typed: bool = True) -> Dictoo:
+	return treedef.unflatten(leaves, typed)
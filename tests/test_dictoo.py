@@ -1,7 +1,7 @@
 import pytest
 from typing import Dict
 import dictoo as dt
-import json, yaml, os, sys
+import json, yaml, os, sys, copy, pickle
 
 from dictoo.dictoo import DictooDict
 
@@ -127,6 +127,23 @@ def test_typed_dict(simple_nested_dict):
 	with pytest.raises(TypeError) as e:
 		d.e = "u"
 
+	with pytest.raises(TypeError):
+		dt.Dictoo({'a': 'x'}, __type=int, __lazy=True)
+	lazy = dt.Dictoo({'a': 1, 'b': {'c': 'x'}, 'l': [[2, 'y']]}, __type=int, __lazy=True)
+	with pytest.raises(TypeError):
+		lazy['b']
+	with pytest.raises(TypeError):
+		lazy['l'][0]
+	assert dt.Dictoo({'a': 1, 'l': [2, {'b': 3}]}, __type=int, __lazy=True).to_plain() == {'a': 1, 'l': [2, {'b': 3}]}
+
+	e = dt.Dictoo({}, __type=int)
+	e['a']['b'] = 1
+	assert e.a._tree is e._tree
+	e.set_type(str)
+	e['a']['z'] = 's'
+	with pytest.raises(TypeError):
+		e['a']['y'] = 1
+
 def test_append(list_of_dicts):
 	d = dt.Dictoo(list_of_dicts)
 	items = [[0], {'a': 1}, dt.Dictoo({'b': 1}), []]
@@ -270,3 +287,699 @@ class TestTorch:
 	@pytest.mark.skip
 	def test_slice(self, dicts):
 		print("slice: {}".format(dicts[0].slice((1, 0))))
+
+def test_lazy_constructor(dict_with_list_of_dicts, simple_nested_dict):
+	d = dt.Dictoo(dict_with_list_of_dicts, __lazy=True)
+	# children are not converted before they are accessed
+	assert type(dict.__getitem__(d, 'l')) is list
+	assert d.l[1].b == 3
+	assert isinstance(dict.__getitem__(d, 'l'), dt.Dictoo)
+	assert d.to_plain() == dict_with_list_of_dicts
+	assert d.flattened() == dt.Dictoo(dict_with_list_of_dicts).flattened()
+
+	d = dt.Dictoo(simple_nested_dict, __lazy=True)
+	d.a = 2
+	# untouched subtrees are handed back without copying
+	assert d.to_plain()['b'] is simple_nested_dict['b']
+	assert d.leafs() == [2, 5]
+	d.b.c = 6
+	assert simple_nested_dict['b']['c'] == 5
+
+def test_path(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	p = dt.path('l[1].b')
+	assert p is dt.path('l[1].b')
+	assert p.get(d) == 3
+	assert dt.path('l.[2].a').get(d) == 3
+	assert dt.path(('l', 0, 'a')).get(d) == 1
+	assert dt.path('x.y').get(d, None) is None
+	assert not dt.path('l[5].a').has(d)
+	with pytest.raises(KeyError):
+		dt.path('x.y').get(d)
+	assert 'x' not in d
+
+	p.set(d, 7)
+	assert d.l[1].b == 7
+	dt.path('x.y').set(d, [1, 2])
+	assert d['x.y'] == [1, 2]
+	with pytest.raises(IndexError):
+		dt.path('l[5].a').set(d, 1)
+
+def test_get_tuple_key(simple_nested_dict):
+	d = dt.Dictoo(simple_nested_dict)
+	assert d['b', 'c'] == 5
+	assert d[('a',)] == 1
+
+def test_flatten_unflatten(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	leaves, treedef = dt.flatten(d)
+	assert leaves == [1, 2, 2, 3, 3, 4, 5]
+	assert treedef.num_leaves == len(leaves)
+	assert treedef.unflatten(leaves) == d
+	assert treedef.flatten(dt.Dictoo(dict_with_list_of_dicts)) == leaves
+	assert dt.flatten(dt.Dictoo(dict_with_list_of_dicts))[1] == treedef
+	assert treedef.paths()[0] == ('l', 0, 'a')
+	with pytest.raises(ValueError):
+		treedef.flatten(dt.Dictoo({'l': [], 'm': 5}))
+	with pytest.raises(ValueError):
+		treedef.unflatten(leaves[1:])
+
+def test_apply_reduce_with_treedef(dict_with_list_of_dicts):
+	ds = [dt.Dictoo(dict_with_list_of_dicts) for _ in range(3)]
+	_, treedef = dt.flatten(ds[0])
+	assert dt.apply(lambda x, y: x + y, ds[0], ds[1], _dictoo_treedef=treedef) == dt.apply(lambda x, y: x + y, ds[0], ds[1])
+	assert dt.reduce(sum, ds, _dictoo_treedef=treedef) == dt.reduce(sum, ds)
+	keys = dt.apply(lambda x, _dictoo_key: _dictoo_key, ds[0], _dictoo_pass_key=True, _dictoo_treedef=treedef)
+	assert keys.l[0].a == ['l', '0', 'a']
+
+	typed = dt.Dictoo({'a': 1, 'b': {'c': 2}}, __type=int)
+	_, treedef = dt.flatten(typed)
+	for res in (
+		dt.apply(str, typed, _dictoo_treedef=treedef),
+		dt.apply(str, typed, _dictoo_executor="thread"),
+		dt.reduce(lambda xs: str(sum(xs)), [typed, typed], _dictoo_treedef=treedef),
+		dt.stream_reduce(dt.Mean(), [typed, typed]),
+	):
+		assert res.get_type() is None and res.b.get_type() is None
+		res.b.d = 'x'
+	assert dt.apply(str, typed, _dictoo_treedef=treedef) == dt.apply(str, typed)
+	assert treedef.unflatten([1, 2]).b.get_type() is int
+
+def test_batch_unbatch():
+	np = pytest.importorskip('numpy')
+	records = [{'x': i, 'y': {'z': float(i) / 2, 'name': str(i)}, 'v': np.ones(3) * i} for i in range(4)]
+	d = dt.Dictoo(records)
+	b = d.batch()
+	assert isinstance(b['x'], np.ndarray) and b['x'].dtype.kind == 'i'
+	assert b['x'].tolist() == [0, 1, 2, 3]
+	assert b['y.z'].dtype.kind == 'f'
+	assert b['y.name'] == ['0', '1', '2', '3']
+	assert b['v'].shape == (4, 3)
+	b['x'][:] = 8
+
+	u = b.unbatch()
+	assert isinstance(u, dt.Dictoo) and len(u) == 4
+	assert u[0]['x'] == 8 and type(u[0]['x']) is int
+	assert u[3]['y']['name'] == '3'
+	assert (u[2]['v'] == 2).all()
+
+	with pytest.raises(ValueError):
+		dt.Dictoo([]).batch()
+
+def test_apply_foreach_executor(dict_with_list_of_dicts, monkeypatch):
+	from concurrent.futures import ThreadPoolExecutor
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'parallel_min_leaves', 2)
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	expected = dt.apply(lambda x: x * 2, d)
+	assert dt.apply(lambda x: x * 2, d, _dictoo_executor='thread', _dictoo_chunksize=2) == expected
+	with ThreadPoolExecutor(2) as pool:
+		assert dt.apply(lambda x: x * 2, d, _dictoo_executor=pool) == expected
+	assert dt.apply(abs, d, _dictoo_executor='process') == d
+
+	acc = set()
+	dt.foreach(lambda x, k: acc.add((x, k)), d, executor='thread')
+	assert ('l', 1, 'b') in [k for _, k in acc] and len(acc) == 7
+	with pytest.raises(ValueError):
+		dt.apply(abs, d, _dictoo_executor='gpu')
+
+	# op_args with different structures take the serial path, as without an executor
+	other = dt.Dictoo(dict_with_list_of_dicts)
+	other.extra = 1
+	add = lambda x, y: x + y
+	assert dt.apply(add, d, other, _dictoo_executor='thread') == dt.apply(add, d, other) == expected
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'parallel_workers', 3)
+	assert dt.op._num_workers() == 3
+	assert dt.apply(lambda x: x * 2, d, _dictoo_executor='thread') == expected
+
+def test_iter_json(list_of_different_dicts, tmpdir, monkeypatch):
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'stream_chunk_size', 7)
+	file = os.path.join(tmpdir, "test.json")
+	with open(file, "w+") as f:
+		json.dump(list_of_different_dicts, f)
+	assert [r.to_plain() for r in dt.Dictoo.iter_json(file)] == list_of_different_dicts
+
+	with open(file, "w+") as f:
+		json.dump({'meta': {'s': 'a "]}[{', 'n': [1, {'x': 12345}]}, 'records': list_of_different_dicts + [17, "s"], 'tail': 1}, f)
+	records = list(dt.Dictoo.iter_json(file, items='records[*]'))
+	assert records[:3] == list_of_different_dicts and records[3:] == [17, "s"]
+	assert list(dt.Dictoo.iter_json(file, items='meta.n[*]')) == [1, {'x': 12345}]
+	batches = list(dt.Dictoo.iter_json(file, items='records[*]', batch_size=2))
+	assert [len(b) for b in batches] == [2, 2, 1]
+	assert isinstance(batches[0], dt.Dictoo)
+	with pytest.raises(KeyError):
+		list(dt.Dictoo.iter_json(file, items='missing[*]'))
+
+def test_iter_json_split_numbers(tmpdir, monkeypatch):
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'stream_chunk_size', 4)
+	file = os.path.join(tmpdir, "test.json")
+	values = [1.5, 2e-05, -325.0, 12345, 0.125, 7]
+	# the padding moves the chunk boundaries through every position of the numbers
+	for padding in range(8):
+		with open(file, "w+") as f:
+			f.write('[' + ' ' * padding + '1.5, 2e-5,-3.25E+2 ,12345,\n0.125,7]')
+		assert list(dt.Dictoo.iter_json(file)) == values
+		with open(file, "w+") as f:
+			f.write('{"a":' + ' ' * padding + '1.5e1, "b": {"c": 2.25}}')
+		assert dt.Dictoo.from_file(file, select=['a', 'b.c']).to_plain() == {'a': 15.0, 'b': {'c': 2.25}}
+
+def test_from_file_select_skip(tmpdir, monkeypatch):
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'stream_chunk_size', 5)
+	file = os.path.join(tmpdir, "test.json")
+	skipped = [{'s': 'a"]}\\' * i, 'l': [[i] * i, {'x': '[' * 300}]} for i in range(200)]
+	with open(file, "w+") as f:
+		json.dump({'skipped': skipped, 'a': {'b': [1, {'c': 2}]}, 'z': 3}, f)
+	assert dt.Dictoo.from_file(file, select=['a.b[1]', 'z']).to_plain() == {'a': {'b': [None, {'c': 2}]}, 'z': 3}
+	# the input after the last selected path is not read
+	with open(file, "w+") as f:
+		f.write('{"skipped": ' + json.dumps(skipped) + ', "a": 1, "b": [')
+	assert dt.Dictoo.from_file(file, select=['a']).to_plain() == {'a': 1}
+
+def test_iter_jsonl(list_of_different_dicts, tmpdir):
+	file = os.path.join(tmpdir, "test.jsonl")
+	with open(file, "w+") as f:
+		for r in list_of_different_dicts:
+			f.write(json.dumps(r) + "\n")
+	assert list(dt.Dictoo.iter_jsonl(file)) == list_of_different_dicts
+	batches = list(dt.Dictoo.iter_jsonl(file, batch_size=2))
+	assert batches[1].to_plain() == list_of_different_dicts[2:]
+
+def test_from_file_select(tmpdir):
+	data = {
+		'model': {'optimizer': {'lr': 0.1, 'name': 'adam'}, 'layers': [1, 2, 3]},
+		'data': {'paths': ['a', 'b'], 'size': 10},
+		'unused': [{'x': 'y'}] * 10,
+	}
+	for name, dump in [("test.json", json.dump), ("test.yaml", yaml.dump)]:
+		file = os.path.join(tmpdir, name)
+		with open(file, "w+") as f:
+			dump(data, f)
+		d = dt.Dictoo.from_file(file, select=['model.optimizer', 'data.paths', 'model.layers[1]', 'missing.key'])
+		assert d.to_plain() == {
+			'model': {'optimizer': {'lr': 0.1, 'name': 'adam'}, 'layers': [None, 2]},
+			'data': {'paths': ['a', 'b']},
+		}
+		assert dt.Dictoo.from_file(file, select=['data', 'data.size']).to_plain() == {'data': data['data']}
+
+def test_from_file_cache(simple_nested_dict, tmpdir, monkeypatch):
+	monkeypatch.setitem(dt.dictoo.CONFIG, 'cache_dir', os.path.join(tmpdir, 'cache'))
+	file = os.path.join(tmpdir, "test.yaml")
+	with open(file, "w+") as f:
+		yaml.dump(simple_nested_dict, f)
+
+	assert dt.Dictoo.from_file(file, cache=True) == simple_nested_dict
+	assert len(os.listdir(os.path.join(tmpdir, 'cache'))) == 1
+
+	def fail(*args, **kwargs):
+		raise AssertionError("the cached file should not be parsed again")
+	with monkeypatch.context() as m:
+		m.setattr(yaml, 'load', fail)
+		assert dt.Dictoo.from_file(file, cache=True) == simple_nested_dict
+
+	# changing the file invalidates the cache
+	with open(file, "w+") as f:
+		yaml.dump({'a': 2}, f)
+	assert dt.Dictoo.from_file(file, cache=True) == {'a': 2}
+
+	# concurrent loads from threads write separate temporary files
+	import shutil
+	from concurrent.futures import ThreadPoolExecutor
+	shutil.rmtree(os.path.join(tmpdir, 'cache'))
+	with ThreadPoolExecutor(8) as pool:
+		results = list(pool.map(lambda _: dt.Dictoo.from_file(file, cache=True), range(16)))
+	assert all(r == {'a': 2} for r in results)
+	assert [name for name in os.listdir(os.path.join(tmpdir, 'cache')) if name.endswith('.tmp')] == []
+
+def test_search_all(nested_dict_same_key, list_of_different_dicts):
+	d = dt.Dictoo(nested_dict_same_key)
+	assert d.search_all('a') == [(('a', 'a', 'a'), 3), (('a', 'a'), {'a': 3}), (('a',), {'a': {'a': 3}})]
+	d = dt.Dictoo(list_of_different_dicts)
+	assert d.search_all('a') == [((0, 'a'), 1), ((1, 'a'), 3), ((2, 'a'), 5)]
+	assert d.search_all('u') == []
+
+def test_search_index(dict_with_list_of_dicts, nested_dict_same_key):
+	d = dt.Dictoo({'x': dict_with_list_of_dicts, 'n': nested_dict_same_key})
+	expected = d.search_all('a')
+	d.build_index()
+	assert d.search_all('a') == expected
+	assert d.search('a') == 1
+	assert d.x.search_all('b') == [(('l', 0, 'b'), 2), (('l', 1, 'b'), 3), (('l', 2, 'b'), 4)]
+
+	d.x.l.insert(0, {'b': 0})
+	d.x.l[1] = {'c': 1}
+	d['y.b'] = 7
+	d.x.l.append({'b': 9})
+	del d.x.l[2]
+	assert d.search_all('b') == [(('x', 'l', 0, 'b'), 0), (('x', 'l', 2, 'b'), 4), (('x', 'l', 3, 'b'), 9), (('y', 'b'), 7)]
+	del d.n
+	assert d.search_all('a') == [(('x', 'l', 2, 'a'), 3)]
+	assert d.search('c') == 1
+	with pytest.raises(KeyError):
+		d.search('n')
+
+	d.drop_index()
+	assert d._get_index() is None
+	assert d.search_all('b')[0] == (('x', 'l', 0, 'b'), 0)
+
+	root = dt.Dictoo({'a': {'id': 1, 'b': {'id': 2}}, 'id': 3})
+	root.build_index()
+	for method in (root.a.build_index, root.a.drop_index, root.a.track_changes):
+		with pytest.raises(RuntimeError):
+			method()
+	with pytest.raises(RuntimeError):
+		root.a.set_type(int)
+	root.set_type(int)
+	with pytest.raises(TypeError):
+		root.a.b.x = 'y'
+	assert len(root.search_all('id')) == 3
+	root.a.pop('b')
+	assert root.search_all('id') == [(('a', 'id'), 1), (('id',), 3)]
+
+	f = dt.Dictoo({'p': {}})
+	f.build_index()
+	f.p.a = {'id': 1}
+	f.p.b = f.p.a
+	assert f.p.b is not f.p.a and f.p.b == f.p.a
+	del f.p.a
+	assert f.search_all('id') == [(('p', 'b', 'id'), 1)]
+
+def test_iter_flattened_from_flat(dict_with_list_of_dicts, list_of_different_dicts, list_of_list_of_dicts):
+	for data in [dict_with_list_of_dicts, list_of_different_dicts, list_of_list_of_dicts, {'a': {'b': [1, [2, {'c': 3}]]}}]:
+		d = dt.Dictoo(data)
+		assert list(d.iter_flattened()) == list(d.flattened().items())
+		assert dt.Dictoo.from_flat(d.flattened()).to_plain() == data
+
+	assert dt.Dictoo.from_flat({'a[2].b': 1, 'c': {}}).to_plain() == {'a': [None, None, {'b': 1}], 'c': {}}
+	assert dt.Dictoo.from_flat({}) == {}
+	for flat in ({'a': 1, 'a.b': 2}, {'a.b': 2, 'a': 1}, {'a[0]': 1, 'a.b': 2}, {'x': None, 'x.y': 1}, {'l[0].a': 1, 'l[0]': None}):
+		with pytest.raises(ValueError):
+			dt.Dictoo.from_flat(flat)
+	assert dt.Dictoo.from_flat({'l[1]': 1, 'l[0].a': 2}).to_plain() == {'l': [{'a': 2}, 1]}
+
+def test_compact_nodes(simple_nested_dict, list_of_dicts):
+	d = dt.Dictoo(simple_nested_dict, __type=int)
+	assert not hasattr(d, '__dict__')
+	assert not hasattr(dt.Dictoo(list_of_dicts), '__dict__')
+	# the type is stored once per tree
+	assert d.b._tree is d._tree
+	assert copy.deepcopy(d) == d
+	d.b.set_type(str)
+	assert d.b.get_type() is str and d.get_type() is int
+	with pytest.raises(TypeError):
+		d.b.c = 1
+
+def test_frozen(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts).freeze()
+	assert isinstance(d, dt.FrozenDictoo) and isinstance(d, dt.Dictoo)
+	assert d == dict_with_list_of_dicts
+	assert hash(d) == hash(dt.FrozenDictoo(dict_with_list_of_dicts))
+	assert d.l[1].b == 3 and d['l'][1]['b'] == 3
+	with pytest.raises(TypeError):
+		d['m'] = 1
+	with pytest.raises(TypeError):
+		d.l.append(1)
+	with pytest.raises(TypeError):
+		d.l[0].a = 2
+	with pytest.raises(KeyError):
+		d['x']
+
+	e = d.set_in('l[1].b', 7)
+	assert e.l[1].b == 7 and d.l[1].b == 3
+	# untouched subtrees are shared
+	assert e.l[0] is d.l[0] and e.l[2] is d.l[2]
+	assert e != d and {d: 1, e: 2}[d] == 1
+	f = e.set_in('n.o', [1, 2]).delete_in('m')
+	assert f.to_plain() == {'l': [{'a': 1, 'b': 2}, {'a': 2, 'b': 7}, {'a': 3, 'b': 4}], 'n': {'o': [1, 2]}}
+	assert f.n.o[1] == 2
+
+	t = d.thaw()
+	t.m = 6
+	assert t.m == 6 and d.m == 5
+	assert pickle.loads(pickle.dumps(d)) == d
+	assert copy.deepcopy(d) is d
+
+def test_diff_patch(dict_with_list_of_dicts):
+	a = dt.Dictoo(dict_with_list_of_dicts)
+	assert dt.diff(a, dt.Dictoo(dict_with_list_of_dicts)) == []
+	changed = copy.deepcopy(dict_with_list_of_dicts)
+	changed['l'][1]['b'] = 7
+	changed['l'].append({'a': 4})
+	b = dt.Dictoo(changed)
+	b[('n/~.x',)] = {'o': 1}
+	del b.m
+	ops = dt.diff(a, b)
+	assert ops == [
+		{'op': 'replace', 'path': '/l/1/b', 'value': 7},
+		{'op': 'add', 'path': '/l/3', 'value': {'a': 4}},
+		{'op': 'remove', 'path': '/m'},
+		{'op': 'add', 'path': '/n~1~0.x', 'value': {'o': 1}},
+	]
+	assert dt.patch(a, ops) == b
+	assert dt.patch(b, dt.diff(b, dt.Dictoo({'l': [{'a': 1}]}))) == {'l': [{'a': 1}]}
+
+	f = dt.FrozenDictoo(dict_with_list_of_dicts)
+	assert dt.diff(f, f.set_in('l[2].a', 0)) == [{'op': 'replace', 'path': '/l/2/a', 'value': 0}]
+	with pytest.raises(ValueError):
+		dt.patch(a, [{'op': 'move', 'path': '/m'}])
+
+def test_pickle(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	d.l.set_type(int)
+	l = dt.Dictoo([{'a': [1, 2]}, {'a': [1, 2]}], __lazy=True)
+	for protocol in (2, pickle.HIGHEST_PROTOCOL):
+		r = pickle.loads(pickle.dumps(d, protocol=protocol))
+		assert r == d and isinstance(r.l, dt.dictoo.DictooList)
+		assert r.l.get_type() is int and r.get_type() is None
+		assert list.__getitem__(r.l, 0)._tree is r.l._tree
+		r = pickle.loads(pickle.dumps(l, protocol=protocol))
+		assert r == l and r._lazy and isinstance(r[0].a, dt.dictoo.DictooList)
+
+	buffers = []
+	data = pickle.dumps(dt.Dictoo({'b': b'x' * 1000}), protocol=5, buffer_callback=buffers.append)
+	assert len(buffers) == 1 and len(data) < 1000
+	assert pickle.loads(data, buffers=buffers) == {'b': b'x' * 1000}
+
+def test_pickle_numpy():
+	np = pytest.importorskip('numpy')
+	d = dt.Dictoo({'x': [np.arange(1000), np.ones(1000)]})
+	buffers = []
+	data = pickle.dumps(d, protocol=5, buffer_callback=buffers.append)
+	assert len(buffers) == 2
+	r = pickle.loads(data, buffers=buffers)
+	assert np.shares_memory(r.x[0], np.frombuffer(buffers[0], dtype=r.x[0].dtype))
+	assert (r.x[1] == d.x[1]).all()
+
+def test_shared():
+	np = pytest.importorskip('numpy')
+	d = dt.Dictoo({'x': np.arange(10), 'y': [np.ones((2, 3), dtype=np.float32), 'label'], 'o': np.array([None])})
+	handle = dt.to_shared(d)
+	remote = pickle.loads(pickle.dumps(handle))
+	r = dt.from_shared(remote)
+	assert r.y[1] == 'label' and r.y[0].shape == (2, 3) and r.o[0] is None
+	assert (r.x == d.x).all()
+
+	local = dt.from_shared(handle)
+	local.x[0] = 42
+	assert r.x[0] == 42 and d.x[0] == 0
+
+	del r, local
+	remote.close()
+	handle.close()
+	handle.unlink()
+
+def test_from_files(tmp_path):
+	for i in range(3):
+		with open(tmp_path / "part{}.json".format(i), "w") as f:
+			json.dump({'common': {'i': i, 'v{}'.format(i): True}}, f)
+	with open(tmp_path / "part3.yaml", "w") as f:
+		yaml.dump({'y': 1}, f)
+
+	loaded = dt.Dictoo.from_files(str(tmp_path / "part*"), workers=2)
+	assert list(loaded) == [str(tmp_path / "part{}.{}".format(i, 'yaml' if i == 3 else 'json')) for i in range(4)]
+	assert loaded[str(tmp_path / "part1.json")].common.i == 1
+
+	merged = dt.Dictoo.from_files([tmp_path / "part2.json", tmp_path / "part0.json"], merge=True)
+	assert merged == {'common': {'i': 0, 'v0': True, 'v2': True}}
+	with pytest.raises(FileNotFoundError):
+		dt.Dictoo.from_files(str(tmp_path / "missing*"))
+
+	import asyncio
+	d = asyncio.run(dt.Dictoo.from_file_async(tmp_path / "part3.yaml"))
+	assert d.y == 1
+
+def test_to_json_yaml(tmp_path, dict_with_list_of_dicts):
+	data = dict(dict_with_list_of_dicts, e={}, n={'x': [[1, 2], []], 'y': None})
+	d = dt.Dictoo(data)
+	assert d.to_json() == json.dumps(data)
+	assert d.to_json(indent=2, sort_keys=True) == json.dumps(data, indent=2, sort_keys=True)
+	assert yaml.load(d.to_yaml(), Loader=yaml.FullLoader) == data
+	keys = {1: {'a': [1]}, None: [{}], 2.5: [], True: {'b': ['\u00e9']}}
+	assert dt.Dictoo(keys).to_json() == json.dumps(keys)
+	lazy = dt.Dictoo(data, __lazy=True)
+	assert lazy.to_json(indent='\t') == json.dumps(data, indent='\t')
+
+	d.dump(tmp_path / "d.json")
+	d.dump(tmp_path / "d.yaml")
+	assert dt.Dictoo.from_file(tmp_path / "d.yaml") == data
+	with open(tmp_path / "d.json") as f:
+		assert json.load(f) == json.loads(json.dumps(data))
+
+	with pytest.raises(TypeError):
+		dt.Dictoo({'s': {1}}).to_json()
+	dt.register_encoder(set, sorted)
+	try:
+		assert dt.Dictoo({'s': {2, 1}}).to_json() == '{"s": [1, 2]}'
+	finally:
+		del dt.serialize._ENCODERS[set]
+
+def test_to_json_numpy():
+	np = pytest.importorskip('numpy')
+	d = dt.Dictoo({'a': np.arange(3), 'b': [np.float32(0.5), {'c': np.ones((2, 2))}]})
+	plain = {'a': [0, 1, 2], 'b': [0.5, {'c': [[1.0, 1.0], [1.0, 1.0]]}]}
+	assert json.loads(d.to_json()) == plain
+	assert yaml.safe_load(d.to_yaml()) == plain
+
+def test_schema():
+	schema = dt.Schema({'lr': float, 'layers': [int], 'data': {'paths': [str], 'opts': [{'n': (int, type(None))}]}, 'extra': None})
+	good = {'lr': 0.1, 'layers': [1, 2], 'data': {'paths': ['a'], 'opts': [{'n': None}, {'n': 3}]}, 'extra': [1], 'other': 'x'}
+	d = dt.Dictoo(good, __trusted=True)
+	assert d == good and isinstance(d.data.opts, dt.dictoo.DictooList)
+	dotted = {'x': 1, 'a.b': {'c.d': 2}, 'l': [{'e.f': 3}], 'a.g': 4}
+	assert dt.Dictoo(dotted, __trusted=True).to_plain() == dt.Dictoo(dotted).to_plain() == {
+		'x': 1, 'a': {'b': {'c': {'d': 2}}, 'g': 4}, 'l': [{'e': {'f': 3}}],
+	}
+	schema.validate(d)
+	schema.validate(dt.Dictoo(good, __lazy=True))
+
+	bad = dt.Dictoo(good)
+	bad.lr = 1
+	bad.data.paths = ['a', 2]
+	del bad['extra']
+	assert schema.errors(bad) == [
+		(('lr',), "expected float, got int"),
+		(('data', 'paths', 1), "expected str, got int"),
+		(('extra',), "missing"),
+	]
+	with pytest.raises(TypeError, match="data.paths.1: expected str"):
+		schema.validate(bad)
+	# only the touched subtrees are checked
+	assert schema.errors(bad, ['layers', 'data.opts[1].n', 'other']) == []
+	assert schema.errors(bad, [('data', 'paths')]) == [(('data', 'paths', 1), "expected str, got int")]
+
+def test_stats(dict_with_list_of_dicts):
+	check_value = dt.dictoo.Dictoo._check_value
+	apply = dt.apply
+	dt.enable_stats()
+	try:
+		dt.reset_stats()
+		d = dt.Dictoo(dict_with_list_of_dicts)
+		d.x.y = 1
+		d[('l', 0, 'a')]
+		d['x.y'], d['x.y']
+		dt.reduce(sum, [d, d])
+		counters = dt.stats()['counters']
+		assert counters['autovivifications'] == 1
+		assert counters['wraps'] >= 5 and counters['node_allocations'] >= counters['wraps']
+		assert counters['max_traversal_depth'] == 3
+		assert counters['key_lookups'] >= 2
+		timers = dt.stats(reset=True)['timers']
+		assert timers['reduce']['calls'] == 1 and timers['reduce']['seconds'] > 0
+		assert dt.stats()['counters'].get('wraps', 0) == 0
+	finally:
+		dt.disable_stats()
+	assert dt.dictoo.Dictoo._check_value is check_value and dt.apply is apply and dt.op.apply is apply
+	assert not dt.stats()['enabled']
+
+def test_lazy_imports_and_config(tmp_path):
+	import subprocess
+	with open(tmp_path / "config.json", "w") as f:
+		json.dump({"delim": "/"}, f)
+	code = (
+		"import sys, dictoo\n"
+		"from dictoo.dictoo import CONFIG\n"
+		"assert dict.__len__(CONFIG) == 0\n"
+		"d = dictoo.Dictoo({'a': {'b': 1}})\n"
+		"assert d['a/b'] == 1 and CONFIG['parallel_min_leaves'] == 64\n"
+		"d.to_json()\n"
+		"print(' '.join(m for m in ('yaml', 'concurrent.futures') if m in sys.modules))\n"
+	)
+	env = dict(os.environ, DICTOO_CONFIG_FILE=str(tmp_path / "config.json"))
+	env["PYTHONPATH"] = os.pathsep.join([os.path.dirname(os.path.dirname(os.path.abspath(dt.__file__))), env.get("PYTHONPATH", "")])
+	res = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+	assert res.returncode == 0, res.stderr
+	assert res.stdout.strip() == ""
+
+def test_config_load_threads(monkeypatch):
+	import threading, time
+	exists = os.path.exists
+	def slow_exists(path):
+		time.sleep(0.05)
+		return exists(path)
+	monkeypatch.setattr(os.path, "exists", slow_exists)
+	config = dt.dictoo._Config()
+	results, errors = [], []
+	def lookup():
+		try:
+			results.append(config["delim"])
+		except Exception as e:
+			errors.append(e)
+	threads = [threading.Thread(target=lookup) for _ in range(4)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	assert errors == [] and results == ["."] * 4
+
+def test_register_format(tmp_path):
+	def read(path, select):
+		with open(path) as f:
+			return dict(line.strip().split("=", 1) for line in f if line.strip())
+	def write(node, fp):
+		for k, v in node.items():
+			fp.write("{}={}\n".format(k, v))
+	dt.register_format(".ini", read, write)
+	try:
+		dt.Dictoo({'a': '1', 'b': 'x'}).dump(tmp_path / "c.ini")
+		assert dt.Dictoo.from_file(tmp_path / "c.ini") == {'a': '1', 'b': 'x'}
+	finally:
+		del dt.dictoo._FORMATS[".ini"]
+	with pytest.raises(ValueError):
+		dt.Dictoo.from_file(tmp_path / "c.ini")
+
+def test_list_views(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	l = d.l
+	assert l[0] is list.__getitem__(l, 0)
+	l[1].b = 7
+	d[('l', 2, 'b')] = 8
+	assert d.l.to_list()[1:] == [{'a': 2, 'b': 7}, {'a': 3, 'b': 8}]
+	head = l[:2]
+	assert head[0] is l[0] and head[1] is l[1]
+	head['a'] = 0
+	assert l['a'] == [0, 0, 3] and l[('a',)] == [0, 0, 3] and l[1:, 'b'] == [7, 8]
+
+	lazy = dt.Dictoo(dict_with_list_of_dicts, __lazy=True)
+	lazy.l[:2]['b'] = 5
+	assert lazy.l['b'] == [5, 5, 4]
+
+	c = d.copy()
+	assert c == d and c.l is not d.l and c.l[0] is not d.l[0]
+	c.l[0].a = 9
+	assert d.l[0].a == 0
+	typed = dt.Dictoo({'x': {'y': 1}}, __type=int).copy()
+	with pytest.raises(TypeError):
+		typed.x.z = 'a'
+
+def test_slice_views():
+	np = pytest.importorskip('numpy')
+	d = dt.Dictoo({'a': np.arange(10), 'b': [np.ones((4, 2)), {'c': np.zeros(5)}]})
+	s = dt.slice(d, np.s_[1:3])
+	assert s.a.tolist() == [1, 2] and s.b[1].c.shape == (2,)
+	assert np.shares_memory(s.a, d.a)
+	s.a[0] = 42
+	assert d.a[1] == 42
+
+def test_stream_reduce():
+	def metrics(n):
+		for i in range(n):
+			yield dt.Dictoo({'loss': float(i), 'acc': {'top1': i % 7, 'top5': [i, -i]}})
+	assert dt.stream_reduce(dt.Sum(), metrics(100)) == {'loss': 4950.0, 'acc': {'top1': sum(i % 7 for i in range(100)), 'top5': [4950, -4950]}}
+	assert dt.stream_reduce(dt.Mean(), metrics(5)).loss == 2.0
+	assert dt.stream_reduce(dt.Max(), metrics(10)).acc.top5 == [9, 0]
+	assert dt.stream_reduce(dt.Min(), metrics(10), executor="thread", chunksize=3) == {'loss': 0.0, 'acc': {'top1': 0, 'top5': [0, -9]}}
+	for chunksize in (1, 4, 50):
+		assert dt.stream_reduce(dt.Mean(), metrics(37), executor="thread", chunksize=chunksize).loss == 18.0
+
+	class Concat(dt.Reducer):
+		def init(self, leaf):
+			return [leaf]
+		def merge(self, a, b):
+			return a + b
+	# the order of the values is kept when the partial states are merged
+	assert dt.stream_reduce(Concat(), metrics(20), executor="thread", chunksize=3).loss == [float(i) for i in range(20)]
+	with pytest.raises(ValueError):
+		dt.stream_reduce(dt.Sum(), [])
+
+def test_stream_reduce_numpy():
+	np = pytest.importorskip('numpy')
+	values = [dt.Dictoo({'x': np.full(3, i), 'y': [np.ones(2) * i]}) for i in range(6)]
+	res = dt.stream_reduce(dt.Max(), iter(values), executor="process", chunksize=2)
+	assert res.x.tolist() == [5, 5, 5] and res.y[0].tolist() == [5, 5]
+	assert dt.stream_reduce(dt.Mean(), values).x.tolist() == [2.5, 2.5, 2.5]
+
+def test_query():
+	d = dt.Dictoo({
+		'enc_1': {'bias': 1, 'w': 2}, 'enc_2': {'bias': 3}, 'enc_x': {'bias': 5},
+		'layers': [{'weights': [1, 2], 'lr': 0.1}, {'weights': [3], 'opt': {'lr': 0.2}}],
+		'items': [{'id': i} for i in range(30)],
+	})
+	assert dt.query(r're:/^enc_\d+$/.bias').get_all(d) == [1, 3]
+	assert dt.query('layers[*].weights').get_all(d) == [[1, 2], [3]]
+	assert dt.query('layers.*.weights[-1]').get_all(d) == [2, 3]
+	assert dt.query('items[10:20:3].id').get_all(d) == [10, 13, 16, 19]
+	assert dt.query('**.lr').paths(d) == [('layers', 0, 'lr'), ('layers', 1, 'opt', 'lr')]
+	assert dt.query('**.bias').paths(d)[-1] == ('enc_x', 'bias')
+	assert dt.query('layers[5].weights').get_all(d) == []
+	assert dt.query('layers[*].weights') is dt.query('layers[*].weights')
+
+	assert dt.query('**.lr').set_all(d, 0.5) == 2
+	assert d.layers[1].opt.lr == 0.5 and d.layers[0].lr == 0.5
+	assert dt.query('*.bias').apply(d, lambda x: x * 10) == 3
+	assert d.enc_2.bias == 30 and d.enc_1.w == 2
+	assert dt.query('items[:2].id').apply(d, str) == 2 and d['items'][1].id == '1'
+
+	lazy = dt.Dictoo({'l': [{'x': 1}, {'x': 2}]}, __lazy=True)
+	dt.query('l[*].x').apply(lazy, lambda x: -x)
+	assert lazy == {'l': [{'x': -1}, {'x': -2}]}
+	for bad in ('a..b', 'a[1', 're:/x', 'a[1:2:3:4]'):
+		with pytest.raises(ValueError):
+			dt.query(bad)
+
+def test_track_changes(dict_with_list_of_dicts):
+	d = dt.Dictoo(dict_with_list_of_dicts)
+	with pytest.raises(RuntimeError):
+		d.changes_since(0)
+	replica = dt.Dictoo(dict_with_list_of_dicts)
+	token = d.track_changes()
+	assert d.changes_since(token) == ([], token)
+
+	d.l[1].b = 7
+	d.n.o = 1
+	d.l.append({'a': 4})
+	d.l[3].a = 5
+	del d.m
+	paths, token2 = d.changes_since(token)
+	assert paths == [('l', 1, 'b'), ('l', 3), ('m',), ('n',)]
+	d.tmp = 1
+	del d.tmp
+	ops, token2 = d.delta_since(token)
+	assert ops == [
+		{'op': 'replace', 'path': '/l/1/b', 'value': 7},
+		{'op': 'add', 'path': '/l/3', 'value': {'a': 5}},
+		{'op': 'remove', 'path': '/m'},
+		{'op': 'add', 'path': '/n', 'value': {'o': 1}},
+	]
+	assert dt.patch(replica, ops) == d
+
+	d.l.insert(0, {'a': 0})
+	d.l[4].a = 6
+	ops, token3 = d.delta_since(token2)
+	assert [op['path'] for op in ops] == ['/l']
+	assert dt.patch(replica, ops) == d
+	assert d.changes_since(token3) == ([], token3)
+	# a key that existed at the token is removed even if it was re-created in between
+	del d.n
+	d.n = 2
+	del d.n
+	d.l[0].a = 1
+	d.l[0].a = 2
+	ops, token4 = d.delta_since(token3)
+	assert ops == [{'op': 'replace', 'path': '/l/0/a', 'value': 2}, {'op': 'remove', 'path': '/n'}]
+	assert dt.patch(replica, ops) == d
+
+	lst = dt.Dictoo([1, 2])
+	token = lst.track_changes()
+	del lst[0]
+	assert dt.patch(dt.Dictoo([1, 2]), lst.delta_since(token)[0]) == [2]
+	d.drop_index()
+	with pytest.raises(RuntimeError):
+		d.changes_since(token3)